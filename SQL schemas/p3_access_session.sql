@@ -0,0 +1,7 @@
+CREATE TABLE `P3_access_session` (
+  `user_id` varchar(12) NOT NULL,
+  `entrance_timestamp` datetime NOT NULL,
+  `exit_timestamp` datetime DEFAULT NULL,
+  PRIMARY KEY (`user_id`,`entrance_timestamp`),
+  KEY `idx_access_session_entrance` (`entrance_timestamp`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb3
@@ -0,0 +1,10 @@
+CREATE TABLE `P3_membership_payment` (
+  `user_id` varchar(12) NOT NULL,
+  `log_key` int NOT NULL,
+  `payment_date` date NOT NULL,
+  `membership_type` varchar(45) DEFAULT NULL,
+  `sum_payed` decimal(10,2) DEFAULT NULL,
+  `membership_valid_to` date NOT NULL,
+  PRIMARY KEY (`user_id`,`log_key`),
+  KEY `idx_user_membership_valid_to` (`user_id`,`membership_valid_to`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb3
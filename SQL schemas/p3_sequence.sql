@@ -0,0 +1,5 @@
+CREATE TABLE `P3_sequence` (
+  `name` varchar(45) NOT NULL,
+  `next_value` bigint NOT NULL,
+  PRIMARY KEY (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb3
@@ -1,5 +1,5 @@
 CREATE TABLE `P3_user` (
-  `user_id` varchar(4) NOT NULL,
+  `user_id` varchar(12) NOT NULL,
   `name` varchar(45) DEFAULT NULL,
   `surname` varchar(45) DEFAULT NULL,
   `gender` varchar(1) DEFAULT NULL,
@@ -8,5 +8,6 @@ CREATE TABLE `P3_user` (
   `document_id` varchar(9) DEFAULT NULL,
   `JMBG` varchar(13) DEFAULT NULL,
   `note` text,
-  PRIMARY KEY (`user_id`)
+  PRIMARY KEY (`user_id`),
+  KEY `idx_user_jmbg` (`JMBG`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb3
@@ -1,5 +1,5 @@
 CREATE TABLE `P3_user_log` (
-  `user_id` varchar(4) NOT NULL,
+  `user_id` varchar(12) NOT NULL,
   `membership_log` text,
   `access_log` text,
   PRIMARY KEY (`user_id`)
@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from datetime import datetime
+
+import payment
+
+from data.database import DataManager
+from data.json_data_manager import JSONData
+from data.member_ids import MemberIdAllocator
+from data.membership_expiry import MembershipExpiryScheduler
+from data.membership_index import MembershipIndex
+from log_generator import HistoryGenerator
+from payment import LogExtractor, PaymentProcessor
+from registration import GymRegistration, RegisteredUsers, RegistrationDataGenerator
+
+
+BENCHMARK_RESULTS = 'benchmark_results'
+MEMBERSHIP_TYPES = {
+    '1_month': {'price': 5000, 'duration': 30},
+    '3_months': {'price': 12000, 'duration': 90},
+    '12_months': {'price': 40000, 'duration': 365},
+}
+
+
+def create_stand_in_database(database):
+    """
+    Route every DataManager to a fresh embedded SQLite database; the tables are created from the SQL schemas.
+
+    Returns:
+    DataManager: The manager returned by every later DataManager(...) call.
+    """
+    for previous in DataManager.forget():
+        previous.close()
+
+    manager = DataManager('sqlite', database)
+    DataManager.register(manager, 'mysql')
+    # singletons built on the previous database are rebuilt on first use
+    MembershipIndex.forget()
+    MembershipExpiryScheduler.forget()
+    MemberIdAllocator.forget()
+    return manager
+
+
+def measure(function, calls):
+    """
+    Time `calls` invocations of function(i) and one extra traced invocation for peak memory.
+
+    Returns:
+    dict: calls, total_seconds, throughput_per_second, p50/p95/p99/max latency in milliseconds and
+    peak_memory_kb.
+    """
+    latencies = []
+    for call in range(calls):
+        started = time.perf_counter()
+        function(call)
+        latencies.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    function(calls)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies.sort()
+    total = sum(latencies)
+
+    def percentile(fraction):
+        return latencies[min(int(fraction * len(latencies)), len(latencies) - 1)] * 1000
+
+    return {
+        'calls': calls,
+        'total_seconds': total,
+        'throughput_per_second': calls / total if total else None,
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'max_ms': latencies[-1] * 1000,
+        'peak_memory_kb': peak_memory / 1024,
+    }
+
+
+def run_scale(members, calls, workdir, seed=1):
+    """
+    Populate a stand-in database with `members` members and their history and run every benchmark.
+
+    Returns:
+    dict: benchmark name -> measure() result.
+    """
+    create_stand_in_database(os.path.join(workdir, f'benchmark_{members}.db'))
+    membership_file = os.path.join(workdir, 'membership_data.json')
+    with open(membership_file, 'w') as json_file:
+        json.dump(MEMBERSHIP_TYPES, json_file)
+    payment.MEMBERSHIP_DATA = membership_file
+    id_card = payment.SetMemberIDCard()
+    id_card.filename = card_file = os.path.join(workdir, 'gym_id_card.json')
+    id_card.create_gym_id_card_file()
+
+    generator = RegistrationDataGenerator()
+    member_rows = list(generator.generate_members(members, seed=seed))
+    GymRegistration().register_members(member_rows, batch_size=5000)
+    HistoryGenerator(seed=seed).save_to_database(row[0] for row in member_rows)
+    user_ids = [row[0] for row in member_rows]
+
+    results = {}
+    new_members = list(generator.generate_members(calls + 1, seed=seed + 1))
+    registration = GymRegistration()
+    results['register_member'] = measure(lambda i: registration.register_member(*new_members[i]), calls)
+
+    processor = PaymentProcessor()
+    results['register_payment'] = measure(
+        lambda i: processor.register_payment(user_ids[i % members], '1_month', 5000), calls)
+
+    table_calls = max(calls // 100, 3)
+    results['display_table_data'] = measure(lambda i: RegisteredUsers().display_table_data(), table_calls)
+
+    membership_log = LogExtractor('M')
+    results['get_member_log_membership'] = measure(
+        lambda i: membership_log.get_member_log(user_ids[(i * 7919) % members], True), calls)
+    access_log = LogExtractor('A')
+    results['get_member_log_access'] = measure(
+        lambda i: access_log.get_member_log(user_ids[(i * 7919) % members], False), calls)
+
+    card = JSONData(card_file)
+    results['json_read'] = measure(lambda i: card.read_json('access_log'), calls)
+    results['json_write'] = measure(lambda i: card.write_json(['lockerNumber'], i), calls)
+
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_file):
+    """Print the throughput and p95 change of every benchmark against a previously saved result file."""
+    with open(baseline_file, 'r') as json_file:
+        baseline = json.load(json_file)
+    for scale, benchmarks in results['scales'].items():
+        for name, result in benchmarks.items():
+            previous = baseline['scales'].get(scale, {}).get(name)
+            if not previous:
+                continue
+            print(f"{scale:>7} {name:<28} throughput x{result['throughput_per_second'] / previous['throughput_per_second']:.2f}"
+                  f"  p95 {previous['p95_ms']:.3f} -> {result['p95_ms']:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the registration, payment, entrance and log hot paths.")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="member counts to benchmark")
+    parser.add_argument('--calls', type=int, default=1000, help="timed calls per benchmark")
+    parser.add_argument('--output', help="result file, defaults to benchmark_results/<timestamp>-<commit>.json")
+    parser.add_argument('--compare', help="previous result file to compare with")
+    args = parser.parse_args()
+
+    results = {'commit': git_commit(), 'created': datetime.now().isoformat(timespec='seconds'),
+               'calls': args.calls, 'scales': {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        for members in args.scales:
+            results['scales'][str(members)] = run_scale(members, args.calls, workdir)
+            for name, result in results['scales'][str(members)].items():
+                print(f"{members:>7} {name:<28} {result['throughput_per_second']:>10.1f}/s"
+                      f"  p50 {result['p50_ms']:.3f} ms  p95 {result['p95_ms']:.3f} ms"
+                      f"  p99 {result['p99_ms']:.3f} ms  peak {result['peak_memory_kb']:.0f} KiB")
+
+    output = args.output
+    if output is None:
+        os.makedirs(BENCHMARK_RESULTS, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(BENCHMARK_RESULTS, f"{stamp}-{results['commit'] or 'nocommit'}.json")
+    with open(output, 'w') as json_file:
+        json.dump(results, json_file, indent=4)
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
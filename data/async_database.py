@@ -0,0 +1,131 @@
+import asyncio
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from data.database import DataManager, SingletonDatabase
+
+
+class AsyncDataManager(metaclass=SingletonDatabase):
+    """
+    Asyncio interface to DataManager for terminals served from one event loop.
+
+    Queries run on a dedicated thread pool with one worker per pooled connection, so a slow query only
+    occupies its own connection while the event loop keeps serving other gates and desks. Awaiting a call
+    while all connections are busy queues it without blocking the loop. The same backends, parameter style
+    and ConnectionPool as DataManager are used, so every query of the synchronous classes works unchanged.
+
+    Parameters:
+    - connection_type (str): The type of database connection ('mysql', 'postgresql' or 'sqlite').
+    - dsn, replica_dsn (str, optional): Primary and read replica database, see DataManager.
+    - pool_options: ConnectionPool settings passed to DataManager.
+
+    Usage:
+    ```
+    database = AsyncDataManager('mysql')
+    data = await database.read_data("SELECT user_id FROM P3_user WHERE JMBG = %s", ('0505982700700',))
+    ```
+    """
+    def __init__(self, connection_type, dsn=None, replica_dsn=None, **pool_options):
+        self.manager = DataManager(connection_type, dsn, replica_dsn, **pool_options)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self):
+        """Worker threads, created on first use with one worker per connection of the primary pool."""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.manager.connection.pool.max_size,
+                                                        thread_name_prefix='async-db')
+        return self._executor
+
+    async def _run(self, function, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        instrumentation = self.manager.instrumentation
+        if instrumentation.enabled:
+            # the worker thread does not see the awaiting coroutine on its stack
+            return await loop.run_in_executor(self.executor, partial(
+                self._run_at, instrumentation, instrumentation.call_site(), function, *args, **kwargs))
+        return await loop.run_in_executor(self.executor, partial(function, *args, **kwargs))
+
+    @staticmethod
+    def _run_at(instrumentation, call_site, function, *args, **kwargs):
+        with instrumentation.at(call_site):
+            return function(*args, **kwargs)
+
+    async def run(self, function, *args, **kwargs):
+        """
+        Run a blocking function, e.g. one using `manager.transaction()`, on the worker threads.
+
+        Usage:
+        ```
+        row = await database.run(PaymentProcessor._store_payment, database.manager, '001', membership_log)
+        ```
+        """
+        return await self._run(function, *args, **kwargs)
+
+    async def read_data(self, sql_query, params=None, primary=False, cached=False, prepared=False):
+        """
+        Read data from the database, see DataManager.read_data.
+
+        Returns:
+        A list of tuples containing the retrieved data from the database.
+        """
+        return await self._run(self.manager.read_data, sql_query, params, primary, cached, prepared)
+
+    async def save_data(self, sql_query, data):
+        """
+        Save data to the database, see DataManager.save_data.
+
+        Returns:
+        None if an error occurs, otherwise a confirmation message.
+        """
+        return await self._run(self.manager.save_data, sql_query, data)
+
+    async def save_many(self, sql_query, rows, batch_size=500, fallback=True):
+        """
+        Save many rows in chunks, see DataManager.save_many.
+
+        Returns:
+        list: Per-chunk results.
+        """
+        return await self._run(self.manager.save_many, sql_query, rows, batch_size=batch_size, fallback=fallback)
+
+    async def iter_data(self, sql_query, params=None, chunk_size=1000, primary=False):
+        """
+        Stream rows from a server-side cursor, see DataManager.iter_data.
+
+        Every chunk is fetched on the worker threads, rows are yielded on the event loop.
+
+        Usage:
+        ```
+        async for row in AsyncDataManager('mysql').iter_data("SELECT user_id, access_log FROM P3_user_log"):
+            print(row)
+        ```
+        """
+        rows = self.manager.iter_data(sql_query, params, chunk_size, primary)
+        try:
+            while True:
+                chunk = await self._run(lambda: list(islice(rows, chunk_size)))
+                if not chunk:
+                    break
+                for row in chunk:
+                    yield row
+        finally:
+            await self._run(rows.close)
+
+    def pool_stats(self):
+        return self.manager.pool_stats()
+
+    def cache_stats(self):
+        return self.manager.cache_stats()
+
+    def close(self):
+        """Stop the worker threads."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
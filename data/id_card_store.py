@@ -0,0 +1,347 @@
+import json
+import threading
+
+from datetime import datetime
+from data.database import SingletonDatabase
+from data.json_data_manager import DELETE, JSONData
+
+
+ID_CARDS_DATA = 'data/gym_id_cards.json'
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class IDCard:
+    """Compact in-memory ID card, timestamps are kept as integer epoch seconds."""
+    __slots__ = ('has_access', 'locker_number', 'entrance_timestamp', 'exit_timestamp')
+
+    def __init__(self, has_access=False, locker_number=None, entrance_timestamp=None, exit_timestamp=None):
+        self.has_access = has_access
+        self.locker_number = locker_number
+        self.entrance_timestamp = entrance_timestamp
+        self.exit_timestamp = exit_timestamp
+
+
+def _to_epoch(timestamp):
+    if timestamp is None:
+        return None
+    return int(datetime.strptime(timestamp, TIMESTAMP_FORMAT).timestamp())
+
+
+def _from_epoch(epoch):
+    if epoch is None:
+        return None
+    return datetime.fromtimestamp(epoch).strftime(TIMESTAMP_FORMAT)
+
+
+class IDCardStore(metaclass=SingletonDatabase):
+    """
+    ID cards of all members in the building, keyed by userID.
+
+    Unlike the single data/gym_id_card.json file, the store holds any number of cards in memory with O(1)
+    get/set of hasAccess, lockerNumber and access_log. With a filename the cards are loaded on start and
+    save() persists the changed cards in one locked, atomic write. The entrance (AdmissionEngine.enter) and exit
+    (ExitEventQueue.record_card_exit) gates keep the cards of the members inside here; a gate reads a card
+    written by another terminal with refresh_card().
+
+    Parameters:
+    - filename (str, optional): JSON file for persistence; cards are kept in memory only if None.
+
+    Usage:
+    ```
+    store = IDCardStore(ID_CARDS_DATA)
+    store.set_entrance('001', 12)
+    print(store.get_member_locker_number('001'))
+    store.save()
+    ```
+    """
+    def __init__(self, filename: str = None):
+        self.filename = filename
+        self._cards = {}
+        self._dirty = set()
+        self._removed = set()
+        self._lock = threading.Lock()
+        if filename is not None:
+            self.load()
+
+    def load(self):
+        """
+        Load the cards from the persistence file, replacing the cards in memory.
+
+        Returns:
+        int: Number of loaded cards.
+        """
+        try:
+            with open(self.filename, 'r') as json_file:
+                data = json.load(json_file)
+        except FileNotFoundError:
+            data = {}
+            with open(self.filename, 'w') as json_file:
+                json.dump(data, json_file, indent=4)
+
+        cards = {user_id: self._from_card_data(card_data) for user_id, card_data in data.items()}
+        with self._lock:
+            self._cards = cards
+            self._dirty.clear()
+            self._removed.clear()
+        return len(cards)
+
+    def save(self):
+        """
+        Persist cards changed since the last save with a single JSONData.write_many.
+
+        Returns:
+        str: Confirmation message, or None if there was nothing to save or no persistence file.
+        """
+        if self.filename is None:
+            return None
+        with self._lock:
+            dirty, removed = self._dirty, self._removed
+            self._dirty, self._removed = set(), set()
+            updates = [([user_id], self._card_data(user_id, self._cards[user_id])) for user_id in dirty]
+            updates += [([user_id], DELETE) for user_id in removed]
+        if not updates:
+            return None
+
+        result = JSONData(self.filename).write_many(updates)
+        if result is None:
+            with self._lock:
+                self._dirty |= {user_id for user_id in dirty if user_id in self._cards}
+                self._removed |= {user_id for user_id in removed if user_id not in self._cards}
+        return result
+
+    def refresh_card(self, user_id: str):
+        """
+        Re-read one member's card from the persistence file, e.g. a card written by the entrance gate when the
+        exit gate runs in another process. Changes of this store that are not saved yet are kept.
+
+        Returns:
+        bool: True if the member has a card.
+        """
+        if self.filename is None:
+            return user_id in self._cards
+        data = JSONData(self.filename).read_many([user_id])
+        if data is None:
+            return user_id in self._cards
+        with self._lock:
+            if user_id not in self._dirty and user_id not in self._removed:
+                if data[user_id]:
+                    self._cards[user_id] = self._from_card_data(data[user_id])
+                else:
+                    self._cards.pop(user_id, None)
+            return user_id in self._cards
+
+    @staticmethod
+    def _from_card_data(card_data):
+        access_log = card_data.get('access_log') or {}
+        return IDCard(
+            card_data.get('hasAccess', False),
+            card_data.get('lockerNumber'),
+            _to_epoch(access_log.get('entrance_timestamp')),
+            _to_epoch(access_log.get('exit_timestamp')),
+        )
+
+    @staticmethod
+    def _card_data(user_id, card):
+        return {
+            "userID": user_id,
+            "hasAccess": card.has_access,
+            "lockerNumber": card.locker_number,
+            "access_log": {
+                "entrance_timestamp": _from_epoch(card.entrance_timestamp),
+                "exit_timestamp": _from_epoch(card.exit_timestamp),
+            },
+        }
+
+    def _card(self, user_id):
+        card = self._cards.get(user_id)
+        if card is None:
+            card = self._cards[user_id] = IDCard()
+            self._removed.discard(user_id)
+        self._dirty.add(user_id)
+        return card
+
+    def __contains__(self, user_id):
+        return user_id in self._cards
+
+    def __len__(self):
+        return len(self._cards)
+
+    def user_ids(self):
+        return list(self._cards)
+
+    def entrances(self):
+        """
+        Members inside the building according to their cards: an entrance timestamp without an exit.
+
+        Returns:
+        list: (user_id, entrance datetime) tuples.
+        """
+        with self._lock:
+            return [(user_id, datetime.fromtimestamp(card.entrance_timestamp)) for user_id, card in self._cards.items()
+                    if card.entrance_timestamp is not None and card.exit_timestamp is None]
+
+    def card(self, user_id: str):
+        """
+        Card view for one member with the method surface of SetMemberIDCard and GetMemberIDCardData.
+
+        Usage:
+        ```
+        id_card = IDCardStore().card('001')
+        id_card.set_access(True)
+        print(id_card.get_member_access_status())
+        ```
+        """
+        return MemberIDCard(self, user_id)
+
+    def create_card(self, user_id: str):
+        """
+        Create a card with default data for a member, replacing an existing one.
+
+        Returns:
+        str: Confirmation message.
+        """
+        with self._lock:
+            self._cards[user_id] = IDCard()
+            self._dirty.add(user_id)
+            self._removed.discard(user_id)
+        return f"ID card for member {user_id} created successfully."
+
+    def remove_card(self, user_id: str):
+        """
+        Remove a member's card, e.g. after exit.
+
+        Returns:
+        str: Confirmation message.
+        """
+        with self._lock:
+            if self._cards.pop(user_id, None) is not None:
+                self._dirty.discard(user_id)
+                self._removed.add(user_id)
+        return f"ID card for member {user_id} removed."
+
+    def set_access(self, user_id: str, access: bool):
+        with self._lock:
+            self._card(user_id).has_access = access
+        return f"'{user_id}/hasAccess' updated"
+
+    def set_locker(self, user_id: str, locker: int):
+        with self._lock:
+            self._card(user_id).locker_number = locker
+        return f"'{user_id}/lockerNumber' updated"
+
+    def set_access_log_timestamp(self, user_id: str, key: str):
+        """
+        Set the entrance or exit timestamp of a member's card to the current time.
+
+        Parameters:
+        - user_id (str): Gym member ID.
+        - key (str): The type of timestamp, either 'entrance_timestamp' or 'exit_timestamp'.
+
+        Returns:
+        str: Confirmation message.
+        """
+        if key not in ('entrance_timestamp', 'exit_timestamp'):
+            raise ValueError("key must be 'entrance_timestamp' or 'exit_timestamp'")
+        now = int(datetime.now().timestamp())
+        with self._lock:
+            setattr(self._card(user_id), key, now)
+        return f"'{user_id}/access_log/{key}' updated"
+
+    def set_entrance(self, user_id: str, locker: int = None):
+        """
+        Grant access, set the locker number and the entrance timestamp of a member's card at once.
+
+        Returns:
+        str: Confirmation message.
+        """
+        now = int(datetime.now().timestamp())
+        with self._lock:
+            self._cards[user_id] = IDCard(True, locker, now, None)
+            self._dirty.add(user_id)
+            self._removed.discard(user_id)
+        return f"'{user_id}' entrance registered"
+
+    def get_member_access_status(self, user_id: str):
+        card = self._cards.get(user_id)
+        return card.has_access if card is not None else False
+
+    def get_member_locker_number(self, user_id: str):
+        card = self._cards.get(user_id)
+        return card.locker_number if card is not None else None
+
+    def get_member_access_log(self, user_id: str):
+        """
+        Access log of a member's card, in the format written to the database on exit.
+
+        Returns:
+        dict: entrance_timestamp and exit_timestamp, or None if the member has no card.
+        """
+        card = self._cards.get(user_id)
+        if card is None:
+            return None
+        return {"entrance_timestamp": _from_epoch(card.entrance_timestamp),
+                "exit_timestamp": _from_epoch(card.exit_timestamp)}
+
+    def get_card_data(self, user_id: str):
+        """
+        All card fields of a member in the gym_id_card.json format.
+
+        Returns:
+        dict: userID, hasAccess, lockerNumber and access_log, or None if the member has no card.
+        """
+        card = self._cards.get(user_id)
+        if card is None:
+            return None
+        return self._card_data(user_id, card)
+
+
+class MemberIDCard:
+    """
+    One member's card in an IDCardStore, with the methods of SetMemberIDCard and GetMemberIDCardData.
+
+    Usage:
+    ```
+    id_card = MemberIDCard(IDCardStore(), '001')
+    id_card.set_locker(12)
+    print(id_card.get_member_locker_number())
+    ```
+    """
+    def __init__(self, store: IDCardStore, user_id: str):
+        self.store = store
+        self.user_id = user_id
+
+    def create_gym_id_card_file(self):
+        return self.store.create_card(self.user_id)
+
+    def set_member_id(self, user_id: str):
+        self.user_id = user_id
+        return f"'userID' set to {user_id}"
+
+    def set_access(self, access: bool):
+        return self.store.set_access(self.user_id, access)
+
+    def set_locker(self, locker: int):
+        return self.store.set_locker(self.user_id, locker)
+
+    def set_access_log_timestamp(self, key: str):
+        return self.store.set_access_log_timestamp(self.user_id, key)
+
+    def set_entrance(self, user_id: str = None, locker: int = None):
+        if user_id is not None:
+            self.user_id = user_id
+        return self.store.set_entrance(self.user_id, locker)
+
+    def get_member_id(self):
+        return self.user_id
+
+    def get_member_access_status(self):
+        return self.store.get_member_access_status(self.user_id)
+
+    def get_member_locker_number(self):
+        return self.store.get_member_locker_number(self.user_id)
+
+    def get_member_access_log(self):
+        return self.store.get_member_access_log(self.user_id)
+
+    def get_card_data(self):
+        return self.store.get_card_data(self.user_id)
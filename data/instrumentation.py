@@ -0,0 +1,295 @@
+import json
+import os
+import sys
+import threading
+import time
+
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+
+# upper bounds of the query duration histogram buckets in seconds, the last bucket is +Inf
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# frames of these modules are skipped when looking for the code that issued a query
+INTERNAL_MODULES = frozenset({
+    __name__, 'data.database', 'data.async_database', 'data.query_cache',
+    'contextlib', 'functools', 'threading', 'concurrent.futures.thread', 'asyncio.events',
+})
+
+
+class NullQueryTimer:
+    """Timer handed out while instrumentation is disabled; every call is a no-op."""
+    __slots__ = ()
+
+    def acquired(self):
+        pass
+
+    def finish(self, rows=None, error=None, cached=False):
+        pass
+
+
+NULL_QUERY_TIMER = NullQueryTimer()
+
+
+class NullInstrumentation:
+    """Instrumentation of a DataManager without instrumentation enabled."""
+    enabled = False
+
+    def start(self, sql_query, kind='read'):
+        return NULL_QUERY_TIMER
+
+    @contextmanager
+    def at(self, call_site):
+        yield
+
+    def call_site(self):
+        return None
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+
+class QueryTimer:
+    """Times one query from the connection request to the last row."""
+    __slots__ = ('instrumentation', 'sql_query', 'kind', 'call_site', 'started', 'acquire_seconds')
+
+    def __init__(self, instrumentation, sql_query, kind, call_site):
+        self.instrumentation = instrumentation
+        self.sql_query = sql_query
+        self.kind = kind
+        self.call_site = call_site
+        self.acquire_seconds = 0.0
+        self.started = time.perf_counter()
+
+    def acquired(self):
+        """Mark the moment the pooled connection was handed out."""
+        self.acquire_seconds = time.perf_counter() - self.started
+
+    def finish(self, rows=None, error=None, cached=False):
+        """Record the query; `rows` is the number of returned or written rows."""
+        self.instrumentation.record({
+            'call_site': self.call_site,
+            'kind': self.kind,
+            'sql': self.sql_query,
+            'seconds': time.perf_counter() - self.started,
+            'acquire_seconds': self.acquire_seconds,
+            'rows': rows or 0,
+            'cached': cached,
+            'error': str(error) if error is not None else None,
+        })
+
+
+class QueryInstrumentation:
+    """
+    Per-query timing, slow-query log and per-call-site latency histograms for DataManager.
+
+    Every query is attributed to the function that issued it (e.g. 'PaymentProcessor.get_membership_log_key'),
+    the first caller outside the data access modules. For each call site and query kind ('read', 'stream',
+    'write', 'write_many') the query count, errors, cache hits, returned/written rows, connection acquire time
+    and a duration histogram are aggregated. Queries slower than `slow_query_threshold` are kept in memory and,
+    if `slow_query_log` is given, appended to that file as JSON lines. Query parameters are never recorded,
+    they may contain personal data such as JMBG.
+
+    Hooks added with add_hook() are called with the event dict of every query.
+
+    Parameters:
+    - slow_query_threshold (float): Seconds from which a query counts as slow.
+    - slow_query_log (str, optional): JSON lines file for slow queries.
+    - buckets (tuple): Upper bounds of the histogram buckets in seconds.
+    - max_slow_queries (int): Number of recent slow queries kept in memory.
+
+    Usage:
+    ```
+    instrumentation = DataManager('mysql').enable_instrumentation(slow_query_threshold=0.2,
+                                                                  slow_query_log='slow_queries.jsonl')
+    PaymentProcessor().register_payment('001', '3_months', 12000)
+    print(instrumentation.stats())
+    instrumentation.to_prometheus('gym_db.prom')
+    ```
+    """
+    enabled = True
+
+    def __init__(self, slow_query_threshold=0.5, slow_query_log=None, buckets=DEFAULT_BUCKETS,
+                 max_slow_queries=100):
+        self.slow_query_threshold = slow_query_threshold
+        self.slow_query_log = slow_query_log
+        self.buckets = tuple(sorted(buckets))
+        self.hooks = []
+        self._sites = {}
+        self._slow_queries = deque(maxlen=max_slow_queries)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def add_hook(self, hook):
+        """Call hook(event) after every query."""
+        self.hooks.append(hook)
+
+    def call_site(self):
+        """Qualified name of the function outside the data access modules that issued the current query."""
+        call_site = getattr(self._local, 'call_site', None)
+        if call_site is not None:
+            return call_site
+
+        frame = sys._getframe(1)
+        while frame is not None:
+            if frame.f_globals.get('__name__') not in INTERNAL_MODULES:
+                return frame.f_code.co_qualname
+            frame = frame.f_back
+        return '<unknown>'
+
+    @contextmanager
+    def at(self, call_site):
+        """Attribute the queries of the current thread to `call_site`, used when queries run on worker threads."""
+        previous = getattr(self._local, 'call_site', None)
+        self._local.call_site = call_site
+        try:
+            yield
+        finally:
+            self._local.call_site = previous
+
+    def start(self, sql_query, kind='read'):
+        """
+        Start timing a query.
+
+        Returns:
+        QueryTimer: Call acquired() once a connection is borrowed and finish() when the query is done.
+        """
+        return QueryTimer(self, sql_query, kind, self.call_site())
+
+    def record(self, event):
+        """Aggregate a finished query event."""
+        seconds = event['seconds']
+        with self._lock:
+            site = self._sites.get((event['call_site'], event['kind']))
+            if site is None:
+                site = self._sites[(event['call_site'], event['kind'])] = {
+                    'count': 0, 'errors': 0, 'cached': 0, 'rows': 0, 'seconds': 0.0, 'max_seconds': 0.0,
+                    'acquire_seconds': 0.0, 'slow': 0, 'buckets': [0] * (len(self.buckets) + 1),
+                }
+            site['count'] += 1
+            site['rows'] += event['rows']
+            site['seconds'] += seconds
+            site['acquire_seconds'] += event['acquire_seconds']
+            site['max_seconds'] = max(site['max_seconds'], seconds)
+            site['buckets'][bisect_left(self.buckets, seconds)] += 1
+            if event['error'] is not None:
+                site['errors'] += 1
+            if event['cached']:
+                site['cached'] += 1
+            slow = seconds >= self.slow_query_threshold
+            if slow:
+                site['slow'] += 1
+                slow_query = dict(event, time=datetime.now().isoformat(timespec='milliseconds'))
+                self._slow_queries.append(slow_query)
+
+        if slow and self.slow_query_log is not None:
+            try:
+                with open(self.slow_query_log, 'a') as log_file:
+                    log_file.write(json.dumps(slow_query) + '\n')
+            except OSError as e:
+                print(f"Error writing the slow query log: {e}")
+
+        for hook in self.hooks:
+            hook(event)
+
+    def slow_queries(self):
+        """
+        Most recent slow queries.
+
+        Returns:
+        list: Slow query events, oldest first.
+        """
+        with self._lock:
+            return list(self._slow_queries)
+
+    def stats(self):
+        """
+        Aggregated metrics per call site.
+
+        Returns:
+        dict: 'call_site kind' -> count, errors, cached, rows, seconds, mean_seconds, max_seconds,
+        acquire_seconds, slow and histogram ({bucket upper bound: count}, cumulative like Prometheus).
+        """
+        bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+        stats = {}
+        with self._lock:
+            for (call_site, kind), site in sorted(self._sites.items()):
+                site_stats = {name: value for name, value in site.items() if name != 'buckets'}
+                site_stats['mean_seconds'] = site['seconds'] / site['count']
+                cumulative, histogram = 0, {}
+                for bound, count in zip(bounds, site['buckets']):
+                    cumulative += count
+                    histogram[bound] = cumulative
+                site_stats['histogram'] = histogram
+                stats[f"{call_site} {kind}"] = site_stats
+        return stats
+
+    def reset(self):
+        """Drop all aggregated metrics and slow queries."""
+        with self._lock:
+            self._sites.clear()
+            self._slow_queries.clear()
+
+    @staticmethod
+    def _write(filename, text):
+        """Write through a temporary file so readers (e.g. the node_exporter textfile collector) never see half a file."""
+        temporary = filename + '.tmp'
+        with open(temporary, 'w') as export_file:
+            export_file.write(text)
+        os.replace(temporary, filename)
+
+    def to_json(self, filename=None):
+        """
+        Export the metrics and slow queries as JSON.
+
+        Returns:
+        str: The JSON document, also written to `filename` if given.
+        """
+        text = json.dumps({'created': datetime.now().isoformat(timespec='seconds'),
+                           'slow_query_threshold': self.slow_query_threshold,
+                           'call_sites': self.stats(), 'slow_queries': self.slow_queries()}, indent=4)
+        if filename is not None:
+            self._write(filename, text)
+        return text
+
+    def to_prometheus(self, filename=None):
+        """
+        Export the metrics in the Prometheus text exposition format.
+
+        Returns:
+        str: The metrics, also written to `filename` if given.
+        """
+        lines = [
+            '# HELP gym_db_query_duration_seconds Database query duration by call site.',
+            '# TYPE gym_db_query_duration_seconds histogram',
+        ]
+        counters = {'errors': [], 'cached': [], 'rows': [], 'acquire_seconds': []}
+        for name, site in self.stats().items():
+            call_site, kind = name.rsplit(' ', 1)
+            labels = 'call_site="{}",kind="{}"'.format(call_site.replace('\\', '\\\\').replace('"', '\\"'), kind)
+            for bound, count in site['histogram'].items():
+                lines.append(f'gym_db_query_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'gym_db_query_duration_seconds_sum{{{labels}}} {site["seconds"]}')
+            lines.append(f'gym_db_query_duration_seconds_count{{{labels}}} {site["count"]}')
+            for counter, values in counters.items():
+                values.append(f'{{{labels}}} {site[counter]}')
+
+        descriptions = {
+            'errors': ('gym_db_query_errors_total', 'Failed database queries.'),
+            'cached': ('gym_db_query_cache_hits_total', 'Queries served from the query cache.'),
+            'rows': ('gym_db_query_rows_total', 'Rows returned or written.'),
+            'acquire_seconds': ('gym_db_connection_acquire_seconds_total', 'Time spent waiting for a pooled connection.'),
+        }
+        for counter, values in counters.items():
+            metric, description = descriptions[counter]
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} counter')
+            lines.extend(metric + value for value in values)
+
+        text = '\n'.join(lines) + '\n'
+        if filename is not None:
+            self._write(filename, text)
+        return text
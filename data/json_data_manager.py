@@ -1,22 +1,78 @@
+import copy
 import json
+import os
+import tempfile
+import threading
 
+from contextlib import contextmanager
 from datetime import date
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+_json_cache = {}
+_json_cache_lock = threading.Lock()
+_json_file_locks = {}
+
+# write_many value that removes the key instead of setting it
+DELETE = object()
+
+
 class JSONData:
     def __init__(self, filename) -> None:
         self.filename = filename
-    
+
+    def _load(self):
+        """
+        Return the parsed JSON document, using the process-wide cache keyed by file path.
+
+        The cached document is reused as long as the file's mtime, size and inode are unchanged, so a file is
+        parsed again only after it has been modified. The returned document is shared: callers hand out copies
+        of nested values (see _copy) and never mutate it.
+        """
+        path = os.path.abspath(self.filename)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+        cached = _json_cache.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        with open(path, 'r') as json_file:
+            data = json.load(json_file)
+        with _json_cache_lock:
+            _json_cache[path] = (signature, data)
+        return data
+
+    @staticmethod
+    def _copy(value):
+        """Copy of a value of the shared cached document; strings, numbers, booleans and None are immutable."""
+        if isinstance(value, (dict, list)):
+            return copy.deepcopy(value)
+        return value
+
+    @staticmethod
+    def clear_cache():
+        """Drop all cached JSON documents."""
+        with _json_cache_lock:
+            _json_cache.clear()
+
     def read_json(self, key):
         """
         Read data from the JSON file based on a specified key.
 
-        This method reads the JSON file, retrieves the value associated with the provided key, and returns it.
+        This method returns the value associated with the provided key from the cached JSON document; the file
+        is parsed again only if it changed since the last read.
 
         Parameters:
         - key (str): The key used to retrieve the data from the JSON file.
 
         Returns:
-        The value associated with the specified key in the JSON file.
+        The value associated with the specified key in the JSON file; dicts and lists are copies the caller
+        may change.
 
         Example:
         >>> json_data = JSONData("data.json")
@@ -25,20 +81,93 @@ class JSONData:
 
         """
         try:
-            with open(self.filename, 'r') as json_file:
-                data = json.load(json_file)
-                result = data[key]
-                return result
+            data = self._load()
+            result = data[key]
+            return self._copy(result)
 
         except (FileNotFoundError, json.JSONDecodeError) as e:
             print(f"Error loading data from {self.filename}: {e}")
             return None
 
+    def read_many(self, keys):
+        """
+        Read several keys from the JSON file with a single parse.
+
+        Parameters:
+        - keys (list): The keys to retrieve from the JSON file.
+
+        Returns:
+        dict: key -> value for every requested key, None for keys missing from the file; dicts and lists are
+        copies the caller may change.
+
+        Example:
+        >>> json_data = JSONData("data.json")
+        >>> result = json_data.read_many(["userID", "hasAccess"])
+        >>> print(result)
+
+        """
+        try:
+            data = self._load()
+            return {key: self._copy(data.get(key)) for key in keys}
+
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            print(f"Error loading data from {self.filename}: {e}")
+            return None
+
+    @contextmanager
+    def _file_lock(self):
+        """
+        Hold an exclusive lock for a read-modify-write of the JSON file.
+
+        The lock is an flock on a '<filename>.lock' sidecar file, so it serializes writers across threads and
+        processes (e.g. entrance and exit terminals). On platforms without fcntl only threads of the current
+        process are serialized.
+        """
+        path = os.path.abspath(self.filename)
+        with _json_cache_lock:
+            thread_lock = _json_file_locks.setdefault(path, threading.Lock())
+
+        with thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(path + '.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _replace_file(self, data):
+        """Write the document to a temporary file in the same directory and atomically rename it over the original."""
+        path = os.path.abspath(self.filename)
+        directory = os.path.dirname(path)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.')
+        try:
+            with os.fdopen(file_descriptor, 'w') as temp_file:
+                json.dump(data, temp_file, indent=4)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            if os.path.exists(path):
+                os.chmod(temp_path, os.stat(path).st_mode)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        stat = os.stat(path)
+        # the written values still belong to the caller, the cache keeps its own copy
+        data = copy.deepcopy(data)
+        with _json_cache_lock:
+            _json_cache[path] = ((stat.st_mtime_ns, stat.st_size, stat.st_ino), data)
+
     def write_json(self, keys, value):
         """
         Write data to the JSON file using a specified set of keys.
 
         This method reads the JSON file, modifies the value associated with the specified set of keys, and updates the JSON file with the new data.
+        The update is done under a file lock and the new content replaces the file atomically (see write_many).
 
         Parameters:
         - keys (list): A list of keys to navigate through the JSON structure to locate the target value.
@@ -52,18 +181,47 @@ class JSONData:
         >>> result = json_data.write_json(["my", "nested", "key"], "new_value")
         >>> print(result)
 
+        """
+        if self.write_many([(keys, value)]) is None:
+            return None
+        return f"'{'/'.join(keys)}' updated in the JSON file"
+
+    def write_many(self, updates):
+        """
+        Apply several key-path updates to the JSON file in one read-modify-write.
+
+        The file is locked for the whole update, so concurrent writers cannot lose each other's changes, and the new
+        content is written to a temporary file which is fsynced and renamed over the original, so readers never see a
+        torn file.
+
+        Parameters:
+        - updates (list): (keys, value) pairs, where keys is a list of keys leading to the target value. A value of
+          DELETE removes the key.
+
+        Returns:
+        A message indicating the successful update of the JSON file.
+
+        Example:
+        >>> json_data = JSONData("data.json")
+        >>> result = json_data.write_many([(["userID"], "001"), (["access_log", "entrance_timestamp"], "2023-11-08 10:00:00")])
+        >>> print(result)
+
         """
         try:
-            with open(self.filename, 'r+') as json_file:
-                data = json.load(json_file)
-                nested_dict = data
-                for key in keys[:-1]:
-                    nested_dict = nested_dict.setdefault(key, {})
-                nested_dict[keys[-1]] = value
-                json_file.seek(0)
-                json.dump(data, json_file, indent=4)
-                json_file.truncate()
-            return f"'{'/'.join(keys)}' updated in the JSON file"
+            with self._file_lock():
+                with open(self.filename, 'r') as json_file:
+                    data = json.load(json_file)
+                for keys, value in updates:
+                    nested_dict = data
+                    for key in keys[:-1]:
+                        nested_dict = nested_dict.setdefault(key, {})
+                    if value is DELETE:
+                        nested_dict.pop(keys[-1], None)
+                    else:
+                        nested_dict[keys[-1]] = value
+                self._replace_file(data)
+            updated_keys = ', '.join(f"'{'/'.join(keys)}'" for keys, _ in updates)
+            return f"{updated_keys} updated in the JSON file"
         except (FileNotFoundError, json.JSONDecodeError) as e:
             print(f"Error loading or writing data: {e}")
             return None
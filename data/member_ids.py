@@ -0,0 +1,122 @@
+import threading
+
+from data.database import DataManager, SingletonDatabase
+
+
+MEMBER_ID_SEQUENCE = 'member_id'
+RESERVE_QUERY = "UPDATE P3_sequence SET next_value = next_value + %s WHERE name = %s"
+NEXT_VALUE_QUERY = "SELECT next_value FROM P3_sequence WHERE name = %s"
+CREATE_SEQUENCE_QUERY = "INSERT INTO P3_sequence (name, next_value) VALUES (%s, %s)"
+# user_id is a varchar, the longest and then highest ID is the numerically highest one
+HIGHEST_MEMBER_ID_QUERY = "SELECT user_id FROM P3_user ORDER BY LENGTH(user_id) DESC, user_id DESC LIMIT 1"
+
+
+def format_member_id(member_id: int) -> str:
+    """Member ID as stored in P3_user.user_id, zero padded to at least three digits."""
+    return f"{member_id:03d}"
+
+
+class MemberIdAllocator(metaclass=SingletonDatabase):
+    """
+    Hands out new gym member IDs from a counter row in P3_sequence.
+
+    A block of IDs is reserved with one UPDATE of the counter row and one read in the same transaction; the
+    row lock makes concurrent desks and processes get disjoint blocks, and the cost does not depend on the
+    number of members. next_id() serves single registrations from a block of `block_size` IDs reserved
+    in advance, allocate() reserves a contiguous block for batch registration. IDs of a reserved block that
+    are never used (e.g. when the process stops) are skipped, so member IDs can have gaps.
+
+    The counter row is created on first use from the highest existing user_id.
+
+    Parameters:
+    - connection_type (str): The type of database connection ('mysql', 'postgresql' or 'sqlite').
+    - block_size (int): Number of IDs reserved at once for next_id().
+
+    Usage:
+    ```
+    allocator = MemberIdAllocator()
+    print(allocator.next_id())
+    first_id = allocator.allocate(1000)
+    ```
+    """
+    def __init__(self, connection_type: str = 'mysql', block_size: int = 20):
+        if block_size < 1:
+            raise ValueError("block_size must be a positive integer")
+        self.connection_type = connection_type
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self, database, count):
+        with database.transaction() as cursor:
+            cursor.execute(RESERVE_QUERY, (count, MEMBER_ID_SEQUENCE))
+            if cursor.rowcount == 0:
+                return None
+            cursor.execute(NEXT_VALUE_QUERY, (MEMBER_ID_SEQUENCE,))
+            end = cursor.fetchone()[0]
+        return end - count
+
+    def create_sequence(self):
+        """
+        Create the member ID counter row, starting after the highest existing user_id.
+
+        Returns:
+        int: The first ID the counter hands out.
+
+        Raises:
+        RuntimeError: If P3_user cannot be read; seeding the counter without the highest ID would hand out
+        existing member IDs.
+        """
+        database = DataManager(self.connection_type)
+        highest = database.read_data(HIGHEST_MEMBER_ID_QUERY, primary=True)
+        if highest is None:
+            raise RuntimeError("The highest member ID could not be read, the member ID sequence is not created")
+        first_id = int(highest[0][0]) + 1 if highest else 1
+        # a concurrent desk may create the row first, the insert then fails and its row is used
+        database.save_data(CREATE_SEQUENCE_QUERY, (MEMBER_ID_SEQUENCE, first_id))
+        return first_id
+
+    def allocate(self, count: int) -> int:
+        """
+        Reserve `count` consecutive new member IDs.
+
+        Returns:
+        int: The first ID of the block, the block is [first, first + count).
+
+        Raises:
+        RuntimeError: If the counter row does not exist and cannot be created.
+
+        Usage:
+        ```
+        first_id = MemberIdAllocator().allocate(1000)
+        user_ids = [format_member_id(member_id) for member_id in range(first_id, first_id + 1000)]
+        ```
+        """
+        if count < 1:
+            raise ValueError("count must be a positive integer")
+        database = DataManager(self.connection_type)
+        first_id = self._reserve(database, count)
+        if first_id is None:
+            self.create_sequence()
+            first_id = self._reserve(database, count)
+        if first_id is None:
+            raise RuntimeError("The member ID sequence could not be created")
+        return first_id
+
+    def next_id(self) -> int:
+        """
+        Next new member ID, taken from the block reserved by this process.
+
+        Usage:
+        ```
+        user_id = format_member_id(MemberIdAllocator().next_id())
+        ```
+        """
+        with self._lock:
+            if self._next == self._end:
+                self._next = self.allocate(self.block_size)
+                self._end = self._next + self.block_size
+            member_id = self._next
+            self._next += 1
+        return member_id
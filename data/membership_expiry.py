@@ -0,0 +1,237 @@
+import threading
+
+from datetime import date
+from data.database import SingletonDatabase
+from data.membership_index import MembershipIndex
+
+
+class MembershipExpiryScheduler(metaclass=SingletonDatabase):
+    """
+    Active members with their membership expiry as day ordinals, in a calendar queue of one bucket per day.
+
+    The expiry of every member is converted to date.toordinal() once, when the memberships are loaded or a
+    payment is recorded. A member is active while the current day is before the expiry day; when the day
+    changes, advance() empties the buckets of the days passed and flips exactly the members whose membership
+    lapsed, so the work is proportional to the members that change rather than to all members. The same buckets
+    give the desk the members expiring in N days without a scan.
+
+    Payments recorded through MembershipIndex.update (PaymentProcessor.register_payment) reach the scheduler by
+    subscription. Payments recorded by other desks arrive with any reload of the index, which reports the
+    memberships it extends. Lookups never wait for the database: once the index is older than its `max_age`, a
+    lookup starts refresh() in a background thread, one at a time, and answers from memory. Listeners added with
+    subscribe() are called for every lapsed membership.
+
+    Parameters:
+    - connection_type (str): The type of database connection ('mysql', 'postgresql' or 'sqlite').
+
+    Usage:
+    ```
+    scheduler = MembershipExpiryScheduler()
+    print(scheduler.is_active('001'))
+    print(scheduler.expiring_lists((1, 3, 7)))
+    ```
+    """
+    def __init__(self, connection_type: str = 'mysql'):
+        self.index = MembershipIndex(connection_type)
+        self._valid_to = {}
+        self._by_day = {}
+        self._today = date.today().toordinal()
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._refresher = None
+        self.metrics = {'payments': 0, 'extended': 0, 'lapsed': 0, 'advances': 0, 'refreshes': 0,
+                        'refresh_failures': 0}
+
+        self.index.subscribe(self._on_payment)
+        self.load()
+
+    def _add(self, user_id, valid_to):
+        """Add or extend an active member, caller holds the lock."""
+        current = self._valid_to.get(user_id)
+        if current is not None:
+            if current >= valid_to:
+                return
+            members = self._by_day[current]
+            members.discard(user_id)
+            if not members:
+                del self._by_day[current]
+            self.metrics['extended'] += 1
+        self._valid_to[user_id] = valid_to
+        self._by_day.setdefault(valid_to, set()).add(user_id)
+
+    def load(self, today: date = None, valid_to_dates: dict = None):
+        """
+        Rebuild the queue from the memberships of MembershipIndex.
+
+        Parameters:
+        - today (date, optional): The current day of the queue, defaults to the current date.
+        - valid_to_dates (dict, optional): user_id -> membership_valid_to date, e.g. from a snapshot file. Taken
+          from MembershipIndex.snapshot() if omitted.
+
+        Returns:
+        int: Number of active members.
+        """
+        today = (today or date.today()).toordinal()
+        if valid_to_dates is None:
+            valid_to_dates = self.index.snapshot()
+        with self._lock:
+            current, self._valid_to, self._by_day = self._valid_to, {}, {}
+            self._today = today
+            for user_id, valid_to in valid_to_dates.items():
+                valid_to = valid_to.toordinal()
+                if valid_to > today:
+                    self._add(user_id, valid_to)
+            # payments recorded while the memberships were read are kept
+            for user_id, valid_to in current.items():
+                if valid_to > today:
+                    self._add(user_id, valid_to)
+            return len(self._valid_to)
+
+    def refresh(self):
+        """
+        Reload MembershipIndex from the database. The index reports the memberships the reload extends, e.g.
+        payments at other desks, and only those members are moved in the queue.
+
+        Returns:
+        int or None: Number of active members, None if the database could not be read.
+        """
+        if self.index.load() is None:
+            self.metrics['refresh_failures'] += 1
+            return None
+        self.metrics['refreshes'] += 1
+        return len(self._valid_to)
+
+    def _refresh_in_background(self):
+        """Start refresh() in a background thread unless one is already running."""
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(target=self.refresh, name='membership-refresh', daemon=True)
+            self._refresher.start()
+
+    def _on_payment(self, user_id, valid_to):
+        self.advance()
+        with self._lock:
+            self.metrics['payments'] += 1
+            if valid_to.toordinal() > self._today:
+                self._add(user_id, valid_to.toordinal())
+
+    def advance(self, today: date = None):
+        """
+        Move the queue to `today`, deactivating the members whose membership lapsed since the last advance.
+
+        Parameters:
+        - today (date, optional): The new current day, defaults to the current date. Days before the current
+          day of the queue are ignored.
+
+        Returns:
+        list: IDs of the members whose membership lapsed.
+        """
+        today = (today or date.today()).toordinal()
+        lapsed = []
+        with self._lock:
+            if today <= self._today:
+                return lapsed
+            days = range(self._today + 1, today + 1)
+            if len(days) > len(self._by_day):
+                # after a long pause only the queued days are visited
+                days = sorted(day for day in self._by_day if day <= today)
+            for day in days:
+                for user_id in sorted(self._by_day.pop(day, ())):
+                    del self._valid_to[user_id]
+                    lapsed.append((user_id, day))
+            self._today = today
+            self.metrics['advances'] += 1
+            self.metrics['lapsed'] += len(lapsed)
+
+        for listener in self._listeners:
+            for user_id, day in lapsed:
+                listener(user_id, date.fromordinal(day))
+        return [user_id for user_id, _ in lapsed]
+
+    def _current(self):
+        if self.index.is_stale():
+            self._refresh_in_background()
+        if date.today().toordinal() > self._today:
+            self.advance()
+
+    def subscribe(self, listener):
+        """
+        Call listener(user_id, membership_valid_to) for every membership that lapses.
+
+        Usage:
+        ```
+        MembershipExpiryScheduler().subscribe(lambda user_id, valid_to: print(f"{user_id} lapsed on {valid_to}"))
+        ```
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        """Stop calling a listener added with subscribe()."""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def is_active(self, user_id: str):
+        """True if the member's membership is valid after the current day."""
+        self._current()
+        return user_id in self._valid_to
+
+    def get_valid_to(self, user_id: str):
+        """
+        Membership end date of an active member.
+
+        Returns:
+        date or None: The membership_valid_to date, or None if the member is not active.
+        """
+        self._current()
+        valid_to = self._valid_to.get(user_id)
+        return date.fromordinal(valid_to) if valid_to is not None else None
+
+    def expiring(self, days: int):
+        """
+        Members whose membership lapses in exactly `days` days.
+
+        Returns:
+        list: Sorted member IDs.
+        """
+        self._current()
+        with self._lock:
+            return sorted(self._by_day.get(self._today + days, ()))
+
+    def expiring_lists(self, days=(1, 3, 7)):
+        """
+        Desk reminder lists of the members whose membership lapses in each of the given numbers of days.
+
+        Parameters:
+        - days (iterable): Numbers of days ahead.
+
+        Returns:
+        dict: days -> sorted member IDs.
+
+        Usage:
+        ```
+        for days, user_ids in MembershipExpiryScheduler().expiring_lists((1, 7)).items():
+            print(f"Expiring in {days} days: {', '.join(user_ids)}")
+        ```
+        """
+        return {days_ahead: self.expiring(days_ahead) for days_ahead in days}
+
+    def active_members(self):
+        """Number of members with a valid membership."""
+        self._current()
+        return len(self._valid_to)
+
+    def stats(self):
+        """
+        Scheduler metrics.
+
+        Returns:
+        dict: Payments, extended memberships, lapsed memberships, advances, refreshes, failed refreshes, active
+        members, the number of expiry days queued and the current day.
+        """
+        with self._lock:
+            stats = dict(self.metrics)
+            stats['active'] = len(self._valid_to)
+            stats['queued_days'] = len(self._by_day)
+            stats['today'] = date.fromordinal(self._today).isoformat()
+        return stats
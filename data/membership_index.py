@@ -0,0 +1,166 @@
+import threading
+import time
+
+from datetime import date
+from data.database import DataManager, SingletonDatabase
+
+
+class MembershipIndex(metaclass=SingletonDatabase):
+    """
+    In-memory index of user_id -> latest membership_valid_to date.
+
+    The index is built on first use with a single grouped query over the membership payments and is kept
+    up to date by PaymentProcessor.register_payment, so active-member checks are dictionary lookups
+    instead of a scan and JSON parse of every member's membership log. Payments recorded by other terminals
+    are picked up by reloading the index once it is older than `max_age` seconds. Subscribers added with
+    subscribe() are told about every new payment recorded with update() and about every membership a reload
+    extends.
+
+    Parameters:
+    - connection_type (str): The type of database connection ('mysql', 'postgresql' or 'sqlite').
+    - max_age (float): Seconds after which the next lookup reloads the index from the database.
+
+    Usage:
+    ```
+    index = MembershipIndex()
+    print(index.is_active('001'))
+    ```
+    """
+    def __init__(self, connection_type: str = 'mysql', max_age: float = 60):
+        self.connection_type = connection_type
+        self.max_age = max_age
+        self._valid_to = {}
+        self._loaded = False
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self._subscribers = []
+
+    def load(self, rows=None):
+        """
+        (Re)build the index from membership payments.
+
+        On a reload subscribers are called for the members whose membership is new or later than before, e.g.
+        payments recorded by another desk.
+
+        Parameters:
+        - rows (iterable, optional): (user_id, membership_valid_to) rows, dates as date objects or ISO strings.
+          Read from P3_membership_payment with one grouped query if omitted.
+
+        Returns:
+        int or None: Number of members with a membership in the index, None if the database could not be read;
+        the index then keeps its current entries and the next reload is tried after `max_age` seconds.
+        """
+        if rows is None:
+            rows = DataManager(self.connection_type).read_data(
+                "SELECT user_id, MAX(membership_valid_to) FROM P3_membership_payment GROUP BY user_id")
+            if rows is None:
+                self._loaded_at = time.monotonic()
+                return None
+
+        valid_to = {}
+        for user_id, latest in rows:
+            if isinstance(latest, str):
+                latest = date.fromisoformat(latest)
+            if latest is not None:
+                valid_to[user_id] = latest
+
+        with self._lock:
+            # the first load attempt builds the index, later loads report what they extend
+            reloaded = self._loaded_at is not None
+            changed = []
+            for user_id, latest in valid_to.items():
+                current = self._valid_to.get(user_id)
+                if current is None or current < latest:
+                    changed.append((user_id, latest))
+            for user_id, latest in self._valid_to.items():
+                if user_id not in valid_to or valid_to[user_id] < latest:
+                    valid_to[user_id] = latest
+            self._valid_to = valid_to
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+
+        if reloaded:
+            for user_id, latest in changed:
+                for subscriber in self._subscribers:
+                    subscriber(user_id, latest)
+        return len(valid_to)
+
+    def is_stale(self):
+        """True if the index was never loaded or its last load is older than `max_age` seconds."""
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.max_age
+
+    def _ensure_loaded(self):
+        if self.is_stale():
+            self.load()
+
+    def update(self, user_id: str, membership_valid_to):
+        """
+        Record a new membership payment for a member.
+
+        Parameters:
+        - user_id (str): Gym member ID.
+        - membership_valid_to (date or str): Membership end date, as a date or an ISO 'YYYY-MM-DD' string.
+        """
+        if isinstance(membership_valid_to, str):
+            membership_valid_to = date.fromisoformat(membership_valid_to)
+        with self._lock:
+            current = self._valid_to.get(user_id)
+            changed = current is None or current < membership_valid_to
+            if changed:
+                self._valid_to[user_id] = membership_valid_to
+        if changed:
+            for subscriber in self._subscribers:
+                subscriber(user_id, membership_valid_to)
+
+    def subscribe(self, subscriber):
+        """
+        Call subscriber(user_id, membership_valid_to) whenever update() or a reload extends a membership.
+
+        Usage:
+        ```
+        MembershipIndex().subscribe(lambda user_id, valid_to: print(user_id, valid_to))
+        ```
+        """
+        self._subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber):
+        """Stop calling a subscriber added with subscribe()."""
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+
+    def snapshot(self):
+        """
+        Copy of the index.
+
+        Returns:
+        dict: user_id -> latest membership_valid_to date.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            return dict(self._valid_to)
+
+    def get_valid_to(self, user_id: str):
+        """
+        Latest membership end date of a member.
+
+        Returns:
+        date or None: The membership_valid_to date, or None if the member never paid.
+        """
+        self._ensure_loaded()
+        return self._valid_to.get(user_id)
+
+    def is_active(self, user_id: str, today: date = None):
+        """
+        Check whether a member's latest membership is still valid.
+
+        Parameters:
+        - user_id (str): Gym member ID.
+        - today (date, optional): Reference date, defaults to the current date.
+
+        Returns:
+        bool: True if the membership is valid after today.
+        """
+        valid_to = self.get_valid_to(user_id)
+        if valid_to is None:
+            return False
+        return valid_to > (today or date.today())
@@ -0,0 +1,158 @@
+import json
+import os
+
+from data.database import SCHEMAS_DIR, DataManager
+from data.member_ids import MemberIdAllocator
+from payment import INSERT_ACCESS_SESSION_QUERY, INSERT_MEMBERSHIP_PAYMENT_QUERY
+
+
+MEMBER_ID_TABLES = ('P3_user', 'P3_user_log', 'P3_membership_payment')
+
+
+def apply_schema(filename: str, connection_type: str = 'mysql'):
+    """
+    Execute a DDL file from the SQL schemas directory.
+
+    Parameters:
+    - filename (str): Schema file name, e.g. 'p3_membership_payment.sql'.
+    - connection_type (str): The type of database connection ('mysql' or 'postgresql').
+
+    Returns:
+    The DataManager.save_data result.
+
+    Example:
+    >>> apply_schema('p3_membership_payment.sql')
+    """
+    with open(os.path.join(SCHEMAS_DIR, filename), 'r') as schema_file:
+        ddl = schema_file.read()
+    return DataManager(connection_type).save_data(ddl, None)
+
+
+def migrate_membership_logs(connection_type: str = 'mysql', batch_size: int = 500):
+    """
+    Copy the P3_user_log.membership_log JSON blobs into the append-only P3_membership_payment table.
+
+    Every entry of a member's membership log becomes one payment row with the entry key as log_key. The
+    blobs are streamed member by member and the rows written with DataManager.save_many; entries that were
+    already migrated fail on the primary key and are reported in the chunk results, so the migration can
+    safely be re-run.
+
+    Parameters:
+    - connection_type (str): The type of database connection ('mysql' or 'postgresql').
+    - batch_size (int): Number of payment rows written per transaction.
+
+    Returns:
+    list: Per-chunk results as returned by DataManager.save_many.
+
+    Raises:
+    The database error if reading P3_user_log fails; the chunks written before are kept and the migration
+    can be re-run.
+
+    Example:
+    >>> apply_schema('p3_membership_payment.sql')
+    >>> print(migrate_membership_logs())
+    """
+    database = DataManager(connection_type)
+    user_logs = database.iter_data(
+        "SELECT user_id, membership_log FROM P3_user_log WHERE membership_log IS NOT NULL", primary=True)
+
+    def payment_rows():
+        for user_id, membership_log in user_logs:
+            for log_key, log in json.loads(membership_log).items():
+                yield (user_id, int(log_key), log['payment_date'], log['membership_type'],
+                       log['sum_payed'], log['membership_valid_to'])
+
+    return database.save_many(INSERT_MEMBERSHIP_PAYMENT_QUERY, payment_rows(), batch_size=batch_size)
+
+
+def add_member_jmbg_index(connection_type: str = 'mysql'):
+    """
+    Index P3_user.JMBG on databases created before the index was added to p3_user.sql, so the JMBG -> user_id
+    lookup of PaymentProcessor.get_member_user_id is a single index lookup instead of a table scan.
+
+    Parameters:
+    - connection_type (str): The type of database connection ('mysql' or 'postgresql').
+
+    Returns:
+    The DataManager.save_data result.
+
+    Example:
+    >>> add_member_jmbg_index()
+    """
+    return DataManager(connection_type).save_data("CREATE INDEX idx_user_jmbg ON P3_user (JMBG)", None)
+
+
+def create_member_id_sequence(connection_type: str = 'mysql'):
+    """
+    Create the P3_sequence table and its member ID counter, starting after the highest existing user_id.
+
+    Parameters:
+    - connection_type (str): The type of database connection ('mysql' or 'postgresql').
+
+    Returns:
+    int: The first member ID the sequence hands out.
+
+    Example:
+    >>> print(create_member_id_sequence())
+    """
+    apply_schema('p3_sequence.sql', connection_type)
+    return MemberIdAllocator(connection_type).create_sequence()
+
+
+def widen_member_ids(connection_type: str = 'mysql', length: int = 12):
+    """
+    Widen user_id from varchar(4) (at most 9999 members) in every table that stores it.
+
+    Parameters:
+    - connection_type (str): The type of database connection ('mysql' or 'postgresql').
+    - length (int): New maximum user_id length.
+
+    Returns:
+    list: The DataManager.save_data result per table.
+
+    Example:
+    >>> print(widen_member_ids())
+    """
+    database = DataManager(connection_type)
+    if connection_type == 'postgresql':
+        sql_query = "ALTER TABLE {} ALTER COLUMN user_id TYPE varchar({})"
+    else:
+        sql_query = "ALTER TABLE {} MODIFY user_id varchar({}) NOT NULL"
+    return [database.save_data(sql_query.format(table, length), None) for table in MEMBER_ID_TABLES]
+
+
+def migrate_access_logs(connection_type: str = 'mysql', batch_size: int = 500):
+    """
+    Copy the P3_user_log.access_log JSON blobs into the append-only P3_access_session table.
+
+    Every session with an entrance timestamp becomes one row keyed by (user_id, entrance_timestamp). The
+    blobs are streamed member by member and the rows written with DataManager.save_many; sessions that were
+    already migrated fail on the primary key and are reported in the chunk results, so the migration can
+    safely be re-run.
+
+    Parameters:
+    - connection_type (str): The type of database connection ('mysql' or 'postgresql').
+    - batch_size (int): Number of session rows written per transaction.
+
+    Returns:
+    list: Per-chunk results as returned by DataManager.save_many.
+
+    Raises:
+    The database error if reading P3_user_log fails; the chunks written before are kept and the migration
+    can be re-run.
+
+    Example:
+    >>> apply_schema('p3_access_session.sql')
+    >>> print(migrate_access_logs())
+    """
+    database = DataManager(connection_type)
+    user_logs = database.iter_data(
+        "SELECT user_id, access_log FROM P3_user_log WHERE access_log IS NOT NULL", primary=True)
+
+    def session_rows():
+        for user_id, access_log in user_logs:
+            for session in json.loads(access_log).values():
+                if session.get('entrance_timestamp'):
+                    yield (user_id, session['entrance_timestamp'], session.get('exit_timestamp'))
+
+    return database.save_many(INSERT_ACCESS_SESSION_QUERY, session_rows(), batch_size=batch_size)
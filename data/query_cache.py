@@ -0,0 +1,200 @@
+import re
+import threading
+import time
+
+from collections import OrderedDict
+from functools import lru_cache
+
+
+READ_TABLES = re.compile(r'\b(?:FROM|JOIN)\s+[`"]?(\w+)', re.IGNORECASE)
+WRITE_TABLES = re.compile(r'\b(?:INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM|TRUNCATE(?:\s+TABLE)?'
+                          r'|(?:CREATE|ALTER|DROP)\s+TABLE(?:\s+IF\s+(?:NOT\s+)?EXISTS)?)\s+[`"]?(\w+)',
+                          re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def read_tables(sql_query):
+    """Lower-case names of the tables a SELECT reads from."""
+    return frozenset(table.lower() for table in READ_TABLES.findall(sql_query))
+
+
+@lru_cache(maxsize=1024)
+def written_tables(sql_query):
+    """Lower-case names of the tables an INSERT, UPDATE, DELETE or DDL statement changes."""
+    return frozenset(table.lower() for table in WRITE_TABLES.findall(sql_query))
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of query results with per-table time to live.
+
+    Entries are keyed by SQL query and parameters. An entry expires after the smallest TTL of the tables it
+    reads (`default_ttl` for tables without their own TTL) and is dropped as soon as a write to one of those
+    tables is reported with invalidate(). When more than `max_entries` results are cached, the least
+    recently used one is evicted.
+
+    Every table has a generation that invalidate() increments. A reader takes generation() before it runs
+    the query and passes it to put(); if a write invalidated one of the tables in between, the result may
+    predate the write and is not cached.
+
+    Parameters:
+    - max_entries (int): Maximum number of cached results.
+    - default_ttl (float): Seconds a result stays valid.
+    - table_ttls (dict, optional): table name -> seconds, overrides default_ttl for that table.
+
+    Usage:
+    ```
+    cache = QueryCache(max_entries=256, table_ttls={'P3_user': 300})
+    rows = cache.get(sql_query, params)
+    if rows is None:
+        generation = cache.generation(sql_query)
+        rows = cache.put(sql_query, params, database.read_data(sql_query, params), generation=generation)
+    print(cache.stats())
+    ```
+    """
+    def __init__(self, max_entries=1024, default_ttl=30, table_ttls=None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be a positive integer")
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.table_ttls = {table.lower(): ttl for table, ttl in (table_ttls or {}).items()}
+        self._entries = OrderedDict()
+        self._by_table = {}
+        self._generations = {}
+        self._clears = 0
+        self._lock = threading.Lock()
+        self.metrics = {'hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0, 'invalidated': 0, 'stale': 0}
+
+    @staticmethod
+    def _key(sql_query, params, scope):
+        if isinstance(params, list):
+            params = tuple(params)
+        key = (sql_query, params, scope)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _ttl(self, tables):
+        return min((self.table_ttls.get(table, self.default_ttl) for table in tables), default=self.default_ttl)
+
+    def _drop(self, key):
+        _, _, tables = self._entries.pop(key)
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def _generation(self, tables):
+        """Generation of a set of tables, caller holds the lock."""
+        return (self._clears,) + tuple(self._generations.get(table, 0) for table in sorted(tables))
+
+    def generation(self, sql_query):
+        """
+        Current generation of the tables `sql_query` reads, to be taken before the query runs and passed to put().
+
+        Returns:
+        tuple: Changes whenever one of the tables is invalidated or the cache is cleared.
+        """
+        tables = read_tables(sql_query)
+        with self._lock:
+            return self._generation(tables)
+
+    def get(self, sql_query, params=None, scope=None):
+        """
+        Cached result of the query, or None if it is not cached or has expired.
+
+        Returns:
+        list or None: A copy of the cached rows.
+        """
+        key = self._key(sql_query, params, scope)
+        with self._lock:
+            entry = self._entries.get(key) if key is not None else None
+            if entry is None:
+                self.metrics['misses'] += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._drop(key)
+                self.metrics['expired'] += 1
+                self.metrics['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.metrics['hits'] += 1
+            return list(entry[1])
+
+    def put(self, sql_query, params, rows, scope=None, generation=None):
+        """
+        Cache the rows of a query; None (a failed query) and queries with unhashable parameters are not cached.
+
+        With `generation` from generation(), the rows are not cached either if one of the tables was
+        invalidated since, i.e. while the query ran.
+
+        Returns:
+        The given rows.
+        """
+        key = self._key(sql_query, params, scope)
+        if rows is None or key is None:
+            return rows
+        tables = read_tables(sql_query)
+        ttl = self._ttl(tables)
+        if ttl <= 0:
+            return rows
+
+        with self._lock:
+            if generation is not None and generation != self._generation(tables):
+                self.metrics['stale'] += 1
+                return rows
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, list(rows), tables)
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.metrics['evicted'] += 1
+        return rows
+
+    def invalidate(self, sql_query=None, tables=None):
+        """
+        Drop the cached results that read a table changed by `sql_query` or listed in `tables`.
+
+        Returns:
+        int: Number of dropped results.
+        """
+        changed = set(table.lower() for table in tables or ())
+        if sql_query is not None:
+            changed |= written_tables(sql_query)
+        with self._lock:
+            keys = set()
+            for table in changed:
+                self._generations[table] = self._generations.get(table, 0) + 1
+                keys |= self._by_table.get(table, set())
+            for key in keys:
+                self._drop(key)
+            self.metrics['invalidated'] += len(keys)
+        return len(keys)
+
+    def clear(self):
+        """Drop every cached result."""
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self._clears += 1
+
+    def stats(self):
+        """
+        Cache metrics.
+
+        Returns:
+        dict: hits, misses, expired, evicted, invalidated and stale (results not cached because a write raced the
+        query) counters, hit_ratio and the number of cached results.
+        """
+        with self._lock:
+            stats = dict(self.metrics)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else None
+        return stats
@@ -1 +1,240 @@
-rfqwe
+import numpy as np
+
+from payment import LogExtractor
+
+
+class MembershipColumns:
+    """
+    Membership payments as columnar NumPy arrays, one element per payment.
+
+    Attributes:
+    - user_ids (ndarray): Member IDs, indexed by the `user` column.
+    - user (ndarray[int32]): Member index of each payment.
+    - payment_date (ndarray[datetime64[D]]): Payment day.
+    - valid_to (ndarray[datetime64[D]]): Membership end day.
+    - sum_payed (ndarray[float64]): Amount payed.
+    - membership_types (ndarray): Membership type names, indexed by the `membership_type` column.
+    - membership_type (ndarray[int32]): Membership type index of each payment.
+    """
+    def __init__(self, rows):
+        user_index, users, payment_dates, valid_to, sums, types = {}, [], [], [], [], []
+        for user_id, log_key, payment_date, membership_type, sum_payed, membership_valid_to in rows:
+            users.append(user_index.setdefault(user_id, len(user_index)))
+            payment_dates.append(payment_date)
+            valid_to.append(membership_valid_to)
+            sums.append(sum_payed if sum_payed is not None else 0)
+            types.append(membership_type)
+
+        self.user_ids = np.array(list(user_index), dtype=object)
+        self.user = np.array(users, dtype=np.int32)
+        self.payment_date = np.array(payment_dates, dtype='datetime64[D]')
+        self.valid_to = np.array(valid_to, dtype='datetime64[D]')
+        self.sum_payed = np.array(sums, dtype=np.float64)
+        self.membership_types, membership_type = np.unique(np.array(types, dtype=str), return_inverse=True)
+        self.membership_type = membership_type.astype(np.int32)
+
+    def __len__(self):
+        return len(self.user)
+
+
+class AccessColumns:
+    """
+    Gym sessions (entrance/exit pairs) as columnar NumPy arrays, one element per session.
+
+    Attributes:
+    - user_ids (ndarray): Member IDs, indexed by the `user` column.
+    - user (ndarray[int32]): Member index of each session.
+    - entrance (ndarray[datetime64[s]]): Entrance timestamp.
+    - exit (ndarray[datetime64[s]]): Exit timestamp, NaT while the member is still inside.
+    """
+    def __init__(self, rows):
+        user_index, users, entrances, exits = {}, [], [], []
+        for user_id, entrance_timestamp, exit_timestamp in rows:
+            users.append(user_index.setdefault(user_id, len(user_index)))
+            entrances.append(entrance_timestamp or 'NaT')
+            exits.append(exit_timestamp or 'NaT')
+
+        self.user_ids = np.array(list(user_index), dtype=object)
+        self.user = np.array(users, dtype=np.int32)
+        self.entrance = np.array(entrances, dtype='datetime64[s]')
+        self.exit = np.array(exits, dtype='datetime64[s]')
+
+    def __len__(self):
+        return len(self.user)
+
+
+class GymDataAnalysis:
+    """
+    Attendance and revenue analytics over the membership and access logs.
+
+    The table rows are streamed from LogExtractor straight into columnar arrays; every metric is then
+    computed with vectorized NumPy operations.
+
+    Parameters:
+    - membership_rows (iterable, optional): P3_membership_payment rows in MEMBERSHIP_PAYMENT_COLUMNS order,
+      LogExtractor('M').iter_log_rows() by default.
+    - access_rows (iterable, optional): P3_access_session rows in ACCESS_SESSION_COLUMNS order,
+      LogExtractor('A').iter_log_rows() by default.
+
+    Usage:
+    ```
+    analysis = GymDataAnalysis()
+    months, types, revenue = analysis.revenue_by_type_and_month()
+    print(analysis.hourly_occupancy())
+    ```
+    """
+    def __init__(self, membership_rows=None, access_rows=None):
+        if membership_rows is None:
+            membership_rows = LogExtractor('M').iter_log_rows()
+        if access_rows is None:
+            access_rows = LogExtractor('A').iter_log_rows()
+        self.memberships = MembershipColumns(membership_rows)
+        self.sessions = AccessColumns(access_rows)
+
+    def revenue_by_type_and_month(self):
+        """
+        Revenue per membership type and payment month.
+
+        Returns:
+        tuple: (months ndarray[datetime64[M]], membership type names, revenue ndarray of shape (types, months)).
+        """
+        payment_month = self.memberships.payment_date.astype('datetime64[M]')
+        if len(payment_month) == 0:
+            return payment_month, self.memberships.membership_types, np.zeros((0, 0))
+
+        first_month = payment_month.min()
+        month_index = (payment_month - first_month).astype(np.int64)
+        n_months = int(month_index.max()) + 1
+        n_types = len(self.memberships.membership_types)
+
+        revenue = np.bincount(self.memberships.membership_type * n_months + month_index,
+                              weights=self.memberships.sum_payed, minlength=n_types * n_months)
+        months = first_month + np.arange(n_months)
+        return months, self.memberships.membership_types, revenue.reshape(n_types, n_months)
+
+    def active_members(self, start=None, end=None):
+        """
+        Number of members with a valid membership on each day.
+
+        Overlapping memberships of one member (early renewals) are merged first, so every member is counted
+        at most once per day.
+
+        Parameters:
+        - start, end (str or datetime64, optional): Inclusive day range, defaults to the range of the data.
+
+        Returns:
+        tuple: (days ndarray[datetime64[D]], active member counts ndarray[int64]).
+        """
+        memberships = self.memberships
+        if len(memberships) == 0:
+            return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.int64)
+
+        order = np.lexsort((memberships.payment_date, memberships.user))
+        user = memberships.user[order].astype(np.int64)
+        starts = memberships.payment_date[order].astype(np.int64)
+        ends = memberships.valid_to[order].astype(np.int64)
+
+        # shift every member into its own day range, so a global running max is a per-member running max
+        span = int(max(ends.max(), starts.max()) - min(ends.min(), starts.min())) + 2
+        offset = user * span
+        running_end = np.maximum.accumulate(ends + offset) - offset
+        new_block = np.ones(len(user), dtype=bool)
+        new_block[1:] = (user[1:] != user[:-1]) | (starts[1:] > running_end[:-1])
+        block_starts = starts[new_block]
+        block_ends = running_end[np.append(new_block[1:], True)]
+
+        first_day = int(np.datetime64(start, 'D').astype(np.int64)) if start is not None else int(block_starts.min())
+        last_day = int(np.datetime64(end, 'D').astype(np.int64)) if end is not None else int(block_ends.max())
+        n_days = max(last_day - first_day + 1, 0)
+
+        delta = np.zeros(n_days + 1, dtype=np.int64)
+        np.add.at(delta, np.clip(block_starts - first_day, 0, n_days), 1)
+        np.add.at(delta, np.clip(block_ends - first_day, 0, n_days), -1)
+        counts = np.cumsum(delta)[:n_days]
+
+        days = np.datetime64(first_day, 'D') + np.arange(n_days)
+        return days, counts
+
+    def _occupancy_events(self):
+        """Entrance/exit events sorted by time and the number of members inside after each event."""
+        closed = ~np.isnat(self.sessions.exit)
+        times = np.concatenate([self.sessions.entrance, self.sessions.exit[closed]])
+        changes = np.concatenate([np.ones(len(self.sessions), dtype=np.int64),
+                                  -np.ones(int(closed.sum()), dtype=np.int64)])
+        # exits sort before entrances at the same second
+        order = np.lexsort((changes, times))
+        return times[order], np.cumsum(changes[order])
+
+    def occupancy_at(self, timestamps):
+        """
+        Number of members inside the gym at the given moments.
+
+        Parameters:
+        - timestamps (array-like): Moments as datetime64 values or ISO strings.
+
+        Returns:
+        ndarray[int64]: Occupancy at each timestamp.
+        """
+        timestamps = np.asarray(timestamps, dtype='datetime64[s]')
+        entrances = np.sort(self.sessions.entrance)
+        exits = np.sort(self.sessions.exit[~np.isnat(self.sessions.exit)])
+        return (np.searchsorted(entrances, timestamps, side='right')
+                - np.searchsorted(exits, timestamps, side='right'))
+
+    def hourly_occupancy(self):
+        """
+        Peak occupancy and average number of entrances per hour of the day.
+
+        The peak of an hour is the highest occupancy after any event in that hour or at its first second, so
+        members who entered in an earlier hour and are still inside are counted. Sessions without an exit count
+        until the end of the last day of the data.
+
+        Returns:
+        dict: 'peak' and 'average_entrances', each an ndarray of 24 values indexed by hour.
+        """
+        result = {'peak': np.zeros(24, dtype=np.int64), 'average_entrances': np.zeros(24)}
+        if len(self.sessions) == 0:
+            return result
+
+        times, occupancy = self._occupancy_events()
+        event_hour = (times.astype('datetime64[h]') - times.astype('datetime64[D]')).astype(np.int64)
+        np.maximum.at(result['peak'], event_hour, occupancy)
+
+        # occupancy at the start of every hour covered by the data, for hours entered with members inside
+        first_hour = times.min().astype('datetime64[h]')
+        last_hour = times.max().astype('datetime64[D]').astype('datetime64[h]') + 23
+        hour_starts = np.arange(first_hour, last_hour + 1)
+        start_hour = (hour_starts - hour_starts.astype('datetime64[D]')).astype(np.int64)
+        np.maximum.at(result['peak'], start_hour, self.occupancy_at(hour_starts))
+
+        entrance_hour = (self.sessions.entrance.astype('datetime64[h]')
+                         - self.sessions.entrance.astype('datetime64[D]')).astype(np.int64)
+        entrance_days = self.sessions.entrance.astype('datetime64[D]')
+        n_days = int((entrance_days.max() - entrance_days.min()).astype(np.int64)) + 1
+        result['average_entrances'] = np.bincount(entrance_hour, minlength=24) / n_days
+        return result
+
+    def visit_frequency(self):
+        """
+        Visits per member and average visits per week over the period covered by the access logs.
+
+        Returns:
+        tuple: (user_ids ndarray, visits ndarray[int64], visits per week ndarray[float64]).
+        """
+        visits = np.bincount(self.sessions.user, minlength=len(self.sessions.user_ids))
+        if len(self.sessions) == 0:
+            return self.sessions.user_ids, visits, visits.astype(np.float64)
+
+        entrance_days = self.sessions.entrance.astype('datetime64[D]')
+        weeks = max(int((entrance_days.max() - entrance_days.min()).astype(np.int64)) + 1, 7) / 7
+        return self.sessions.user_ids, visits, visits / weeks
+
+    def session_durations(self):
+        """
+        Duration of every finished session in minutes.
+
+        Returns:
+        ndarray[float64]: Session durations.
+        """
+        closed = ~np.isnat(self.sessions.exit)
+        return (self.sessions.exit[closed] - self.sessions.entrance[closed]).astype(np.float64) / 60
@@ -1,11 +1,225 @@
-import datetime
 import json
+import os
+import threading
 
-from datetime import datetime
-from data.data import PI5_DATA
-from data.database import DatabaseManager
-from data.json_data_manager import JSONData
+from datetime import date, datetime
+from data.database import SingletonDatabase
+from data.id_card_store import ID_CARDS_DATA, IDCardStore
+from data.membership_expiry import MembershipExpiryScheduler
+from occupancy import OccupancyTracker
 
 MEMBERSHIP_DATA = 'data/memebrship_data.json'
 ID_CARD_DATA = 'data/gym_id_card.json'
 LOCKERS_DATA = 'data/lockers.json'
+ADMISSION_SNAPSHOT = 'data/admission_snapshot.json'
+
+
+class AdmissionEngine(metaclass=SingletonDatabase):
+    """
+    Decides at the turnstile whether a member may enter, without a database round-trip.
+
+    The valid memberships are those of the MembershipExpiryScheduler shared with the desk (RegisteredUsers),
+    so admit() is a dictionary lookup that never waits for the database, and lapsed members drop out when the
+    day changes. Payments recorded through MembershipIndex.update (PaymentProcessor.register_payment) reach the
+    scheduler by subscription at once; payments made in other processes arrive with the next reload of the
+    index, by refresh() in the background refresher started by start() or by the scheduler itself.
+
+    Every successful refresh is also written to a snapshot file. If the database cannot be read, the engine
+    keeps answering from its last snapshot, in memory or, after a restart, from that file.
+
+    enter() lets a member through: it writes the member's card to the IDCardStore of the gates and, with an
+    OccupancyTracker, turns members away while the gym is full and counts the entrance.
+
+    Parameters:
+    - connection_type (str): The type of database connection ('mysql', 'postgresql' or 'sqlite').
+    - snapshot_filename (str, optional): Snapshot file, no file is written if None.
+    - refresh_interval (float): Seconds between refreshes of the background refresher started by start().
+    - occupancy (OccupancyTracker, optional): Capacity check and entrance counter used by enter().
+    - id_cards_filename (str, optional): Persistence file of the IDCardStore written by enter().
+
+    Usage:
+    ```
+    engine = AdmissionEngine(occupancy=OccupancyTracker(capacity=120))
+    engine.start()
+    print(engine.enter('001', locker=12))
+    ```
+    """
+    def __init__(self, connection_type: str = 'mysql', snapshot_filename: str = ADMISSION_SNAPSHOT,
+                 refresh_interval: float = 300, occupancy: OccupancyTracker = None,
+                 id_cards_filename: str = ID_CARDS_DATA):
+        self.memberships = MembershipExpiryScheduler(connection_type)
+        self.index = self.memberships.index
+        self.occupancy = occupancy
+        self.id_cards_filename = id_cards_filename
+        self.snapshot_filename = snapshot_filename
+        self.refresh_interval = refresh_interval
+        self._stop = threading.Event()
+        self._refresher = None
+        self.loaded_at = None
+        self.source = None
+        self.metrics = {'admitted': 0, 'denied': 0, 'full': 0, 'refreshes': 0, 'refresh_failures': 0}
+
+        if not self.refresh() and snapshot_filename is not None:
+            self.load_snapshot()
+
+    def refresh(self):
+        """
+        Reload the valid memberships from the database.
+
+        Returns:
+        bool: True if the database was read, False if the engine keeps its last snapshot.
+        """
+        if self.index.load() is None:
+            self.metrics['refresh_failures'] += 1
+            return False
+
+        # the reload moved the extended memberships in the scheduler
+        self.loaded_at = datetime.now()
+        self.source = 'database'
+        self.metrics['refreshes'] += 1
+        if self.snapshot_filename is not None:
+            self.save_snapshot(self.index.snapshot())
+        return True
+
+    def save_snapshot(self, valid_to_dates):
+        """Write the memberships atomically to the snapshot file."""
+        data = {'created': datetime.now().isoformat(timespec='seconds'),
+                'valid_to': {user_id: valid_to.isoformat() for user_id, valid_to in valid_to_dates.items()}}
+        temporary = self.snapshot_filename + '.tmp'
+        try:
+            with open(temporary, 'w') as json_file:
+                json.dump(data, json_file)
+            os.replace(temporary, self.snapshot_filename)
+        except OSError as e:
+            print(f"Error writing admission snapshot '{self.snapshot_filename}': {e}")
+
+    def load_snapshot(self):
+        """
+        Load the memberships from the snapshot file, used when the database is unreachable at start.
+
+        Returns:
+        bool: True if a snapshot was loaded.
+        """
+        try:
+            with open(self.snapshot_filename, 'r') as json_file:
+                data = json.load(json_file)
+        except (OSError, ValueError) as e:
+            print(f"Error reading admission snapshot '{self.snapshot_filename}': {e}")
+            return False
+        valid_to_dates = {user_id: date.fromisoformat(valid_to) for user_id, valid_to in data['valid_to'].items()}
+        self.memberships.load(valid_to_dates=valid_to_dates)
+        self.loaded_at = datetime.now()
+        self.source = f"snapshot {data['created']}"
+        return True
+
+    def expire(self, today: date = None):
+        """
+        Drop the members whose membership lapsed by `today`.
+
+        Returns:
+        int: Number of dropped members.
+        """
+        return len(self.memberships.advance(today))
+
+    def admit(self, user_id: str, today: date = None):
+        """
+        Check at the turnstile whether a member has a valid membership.
+
+        Parameters:
+        - user_id (str): Gym member ID.
+        - today (date, optional): Reference date, defaults to the current date. Lapsed members are only
+          dropped by the current date.
+
+        Returns:
+        bool: True if the membership is valid after today.
+
+        Usage:
+        ```
+        print(AdmissionEngine().admit('001'))
+        ```
+        """
+        if today is None:
+            admitted = self.memberships.is_active(user_id)
+        else:
+            valid_to = self.memberships.get_valid_to(user_id)
+            admitted = valid_to is not None and valid_to > today
+        self.metrics['admitted' if admitted else 'denied'] += 1
+        return admitted
+
+    @property
+    def cards(self):
+        """IDCardStore of the gates, loaded on first use."""
+        return IDCardStore(self.id_cards_filename)
+
+    def enter(self, user_id: str, locker: int = None):
+        """
+        Let a member through the turnstile: the membership must be valid and, with an OccupancyTracker, the
+        gym must not be full. The member's card gets access, the locker and the entrance timestamp and is
+        saved to the IDCardStore; the entrance is counted by the tracker.
+
+        Parameters:
+        - user_id (str): Gym member ID.
+        - locker (int, optional): Locker number assigned to the member.
+
+        Returns:
+        bool: True if the member may enter.
+
+        Usage:
+        ```
+        if AdmissionEngine(occupancy=OccupancyTracker(capacity=120)).enter('001', locker=12):
+            print("Welcome")
+        ```
+        """
+        if not self.admit(user_id):
+            return False
+        if self.occupancy is not None and not self.occupancy.try_enter(user_id):
+            self.metrics['full'] += 1
+            return False
+        cards = self.cards
+        cards.set_entrance(user_id, locker)
+        cards.save()
+        return True
+
+    def active_members(self):
+        """Number of members with a valid membership."""
+        return self.memberships.active_members()
+
+    def start(self):
+        """Refresh from the database every `refresh_interval` seconds in a background thread."""
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        self._stop.clear()
+
+        def refresh_periodically():
+            while not self._stop.wait(self.refresh_interval):
+                self.refresh()
+
+        self._refresher = threading.Thread(target=refresh_periodically, name='admission-refresh', daemon=True)
+        self._refresher.start()
+
+    def stop(self):
+        """Stop the background refresher."""
+        self._stop.set()
+        if self._refresher is not None:
+            self._refresher.join()
+            self._refresher = None
+
+    def stats(self):
+        """
+        Admission metrics.
+
+        Returns:
+        dict: Admitted, denied, full (admitted but turned away by enter()), expired, payments, refreshes,
+        refresh_failures, active members, the time of the last successful load and whether it came from the
+        database or a snapshot file, and the occupancy if a tracker is set.
+        """
+        stats = dict(self.metrics)
+        memberships = self.memberships.stats()
+        stats['expired'] = memberships['lapsed']
+        stats['payments'] = memberships['payments']
+        if self.occupancy is not None:
+            stats['occupancy'] = self.occupancy.occupancy()
+        stats['active'] = memberships['active']
+        stats['loaded_at'] = self.loaded_at.isoformat(timespec='seconds') if self.loaded_at else None
+        stats['source'] = self.source
+        return stats
@@ -1 +1,299 @@
-ddd
+import atexit
+import json
+import os
+import threading
+import time
+
+from collections import deque
+from data.database import SingletonDatabase, is_duplicate_key_error
+from data.id_card_store import ID_CARDS_DATA, IDCardStore
+from occupancy import OccupancyTracker
+from payment import AccessSessionLog
+
+EXIT_JOURNAL = 'data/exit_journal.jsonl'
+
+
+class ExitEventQueue(metaclass=SingletonDatabase):
+    """
+    Write-behind queue for the access sessions of members leaving the gym.
+
+    record_exit() appends the session to a local journal and returns at once, so the gate never waits for the
+    database. A background flusher writes the queued sessions to P3_access_session in batched transactions
+    whenever `batch_size` sessions are waiting or the oldest has waited `flush_interval` seconds. Sessions stay
+    in the journal until they are stored, so sessions queued before a crash or power loss are flushed when the
+    queue is created again. Every gate process needs its own journal file.
+
+    If the database is unreachable the whole batch is retried on the next flush. Sessions that were already
+    stored (replayed after a crash) are dropped; sessions that fail for other reasons are retried
+    `max_attempts` times and then written to the '.failed' file next to the journal.
+
+    With an OccupancyTracker every recorded exit is also counted there.
+
+    Parameters:
+    - journal_filename (str): Journal of the queued sessions.
+    - batch_size (int): Sessions per flush and transaction.
+    - flush_interval (float): Maximum seconds a session waits before it is flushed.
+    - max_attempts (int): Flushes of a failing session before it is set aside.
+    - fsync (bool): fsync the journal after every session; slower, but survives a power loss.
+    - occupancy (OccupancyTracker, optional): Tracker that counts the exits.
+    - id_cards_filename (str): Persistence file of the IDCardStore read by record_card_exit().
+
+    Usage:
+    ```
+    exits = ExitEventQueue()
+    exits.start()
+    exits.record_card_exit('001')
+    print(exits.stats())
+    ```
+    """
+    def __init__(self, journal_filename: str = EXIT_JOURNAL, batch_size: int = 100, flush_interval: float = 1.0,
+                 max_attempts: int = 5, fsync: bool = True, occupancy: OccupancyTracker = None,
+                 id_cards_filename: str = ID_CARDS_DATA):
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+        self.journal_filename = journal_filename
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.fsync = fsync
+        self.occupancy = occupancy
+        self.id_cards_filename = id_cards_filename
+        self.sessions = AccessSessionLog()
+
+        self._pending = deque()
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._journal_lock = threading.Lock()
+        self._flusher = None
+        self._stopping = False
+        self.metrics = {'recorded': 0, 'flushes': 0, 'flushed': 0, 'already_stored': 0, 'failed_flushes': 0,
+                        'retried': 0, 'set_aside': 0, 'flush_seconds': 0.0, 'max_flush_seconds': 0.0,
+                        'last_flush_seconds': None}
+        self._replay_journal()
+
+    def _replay_journal(self):
+        """Queue the sessions of the journal that were not flushed yet."""
+        try:
+            with open(self.journal_filename, 'r') as journal_file:
+                lines = journal_file.readlines()
+        except FileNotFoundError:
+            return
+
+        events, flushed = {}, 0
+        for line in lines:
+            if not line.endswith('\n'):
+                break
+            entry = json.loads(line)
+            if 'flushed' in entry:
+                flushed = max(flushed, entry['flushed'])
+            else:
+                events[entry['seq']] = entry
+        for sequence in sorted(events):
+            if sequence > flushed:
+                self._pending.append(dict(events[sequence], attempts=0, queued=time.monotonic()))
+        self._sequence = max(max(events, default=0), flushed)
+
+    def _write_journal(self, entry):
+        with self._journal_lock:
+            with open(self.journal_filename, 'a') as journal_file:
+                journal_file.write(json.dumps(entry) + '\n')
+                journal_file.flush()
+                if self.fsync:
+                    os.fsync(journal_file.fileno())
+
+    def record_exit(self, user_id: str, access_log: dict):
+        """
+        Queue a finished session; returns as soon as it is in the journal.
+
+        Parameters:
+        - user_id (str): Gym member ID.
+        - access_log (dict): 'entrance_timestamp' and 'exit_timestamp' of the session.
+
+        Returns:
+        int: Queue depth after the session was added.
+
+        Usage:
+        ```
+        ExitEventQueue().record_exit('001', IDCardStore(ID_CARDS_DATA).get_member_access_log('001'))
+        ```
+        """
+        with self._condition:
+            self._sequence += 1
+            entry = {'seq': self._sequence, 'user_id': user_id,
+                     'entrance_timestamp': access_log['entrance_timestamp'],
+                     'exit_timestamp': access_log.get('exit_timestamp')}
+            # journal lines are written in sequence order, the replay relies on it
+            self._write_journal(entry)
+            self._pending.append(dict(entry, attempts=0, queued=time.monotonic()))
+            self.metrics['recorded'] += 1
+            depth = len(self._pending)
+            if depth >= self.batch_size:
+                self._condition.notify()
+        if self.occupancy is not None:
+            self.occupancy.record_exit(user_id, entry['exit_timestamp'])
+        return depth
+
+    @property
+    def cards(self):
+        """IDCardStore of the gates, loaded on first use."""
+        return IDCardStore(self.id_cards_filename)
+
+    def record_card_exit(self, user_id: str):
+        """
+        Set the exit timestamp on the member's card in the IDCardStore, queue the session and remove the card.
+
+        Parameters:
+        - user_id (str): Gym member ID read from the card at the exit gate.
+
+        Returns:
+        int: Queue depth after the session was added, None if the member has no card with an entrance.
+        """
+        cards = self.cards
+        # the card may have been written by an entrance gate in another process
+        access_log = cards.get_member_access_log(user_id) if cards.refresh_card(user_id) else None
+        if access_log is None or access_log['entrance_timestamp'] is None:
+            print(f"No entrance on the ID card of member {user_id}")
+            return None
+
+        cards.set_access_log_timestamp(user_id, 'exit_timestamp')
+        depth = self.record_exit(user_id, cards.get_member_access_log(user_id))
+        cards.remove_card(user_id)
+        cards.save()
+        return depth
+
+    def flush(self):
+        """
+        Write up to `batch_size` queued sessions to the database in one transaction.
+
+        Returns:
+        int: Number of sessions taken off the queue (stored or set aside).
+        """
+        with self._flush_lock:
+            with self._condition:
+                batch = [self._pending[idx] for idx in range(min(self.batch_size, len(self._pending)))]
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            results = self.sessions.record_sessions(
+                ((event['user_id'], event) for event in batch), batch_size=len(batch))
+            seconds = time.perf_counter() - started
+            self.metrics['flushes'] += 1
+            self.metrics['flush_seconds'] += seconds
+            self.metrics['last_flush_seconds'] = seconds
+            self.metrics['max_flush_seconds'] = max(self.metrics['max_flush_seconds'], seconds)
+
+            failed, already_stored = {}, 0
+            for result in results:
+                for idx, error in result['failed']:
+                    # sessions replayed after a crash may already be stored
+                    if is_duplicate_key_error(error):
+                        already_stored += 1
+                    else:
+                        failed[idx] = error
+            if len(failed) == len(batch) and self.sessions.database.read_data("SELECT 1", primary=True) is None:
+                # database unreachable, the whole batch is retried later
+                self.metrics['failed_flushes'] += 1
+                return 0
+
+            retry, set_aside = [], []
+            for idx, error in failed.items():
+                event = batch[idx]
+                event['attempts'] += 1
+                self.metrics['retried'] += 1
+                if event['attempts'] >= self.max_attempts:
+                    set_aside.append(dict(event, error=error))
+                else:
+                    retry.append(event)
+            if set_aside:
+                with open(self.journal_filename + '.failed', 'a') as failed_file:
+                    for event in set_aside:
+                        failed_file.write(json.dumps({key: value for key, value in event.items()
+                                                      if key != 'queued'}) + '\n')
+                self.metrics['set_aside'] += len(set_aside)
+            self.metrics['flushed'] += len(batch) - len(failed) - already_stored
+            self.metrics['already_stored'] += already_stored
+
+            with self._condition:
+                for _ in batch:
+                    self._pending.popleft()
+                # sessions to retry go back to the front in their original order
+                self._pending.extendleft(reversed(retry))
+                if not self._pending:
+                    with self._journal_lock:
+                        open(self.journal_filename, 'w').close()
+                else:
+                    processed = retry[0]['seq'] - 1 if retry else batch[-1]['seq']
+                    if processed > 0:
+                        self._write_journal({'flushed': processed})
+            return len(batch) - len(retry)
+
+    def flush_all(self):
+        """
+        Flush until the queue is empty or a flush stores nothing.
+
+        Returns:
+        int: Number of sessions taken off the queue.
+        """
+        total = 0
+        while True:
+            count = self.flush()
+            total += count
+            if count == 0:
+                return total
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopping:
+                    if len(self._pending) >= self.batch_size:
+                        break
+                    if self._pending:
+                        waited = time.monotonic() - self._pending[0]['queued']
+                        if waited >= self.flush_interval:
+                            break
+                        self._condition.wait(self.flush_interval - waited)
+                    else:
+                        self._condition.wait()
+                if self._stopping:
+                    return
+            if self.flush() == 0:
+                # database unreachable, back off before the next attempt
+                time.sleep(self.flush_interval)
+
+    def start(self):
+        """Start the background flusher; pending sessions are flushed once more when the process exits."""
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        self._stopping = False
+        self._flusher = threading.Thread(target=self._run, name='exit-flusher', daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def close(self):
+        """Stop the background flusher and flush the queued sessions; unflushed sessions stay in the journal."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+            atexit.unregister(self.close)
+        self.flush_all()
+
+    def stats(self):
+        """
+        Queue metrics.
+
+        Returns:
+        dict: depth, oldest_pending_seconds, recorded, flushes, flushed, already_stored, failed_flushes, retried,
+        set_aside and the last, mean and maximum flush latency in seconds.
+        """
+        with self._condition:
+            stats = dict(self.metrics)
+            stats['depth'] = len(self._pending)
+            stats['oldest_pending_seconds'] = (time.monotonic() - self._pending[0]['queued']
+                                               if self._pending else 0.0)
+        stats['mean_flush_seconds'] = stats['flush_seconds'] / stats['flushes'] if stats['flushes'] else None
+        return stats
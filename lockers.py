@@ -1 +1,289 @@
-lockers.pye
+import heapq
+import json
+import os
+import threading
+
+from contextlib import contextmanager
+from data.database import SingletonDatabase
+from data.json_data_manager import JSONData
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+LOCKERS_DATA = 'data/lockers.json'
+LOCKERS_JOURNAL = 'data/lockers_journal.jsonl'
+
+# zone -> size -> inclusive [first, last] locker number range
+DEFAULT_LOCKER_ZONES = {
+    "M": {"S": [1, 60], "L": [61, 80]},
+    "F": {"S": [81, 140], "L": [141, 160]},
+}
+
+
+class LockerAllocator(metaclass=SingletonDatabase):
+    """
+    Assigns and releases lockers in O(log n).
+
+    Free lockers of every (zone, size) pool are kept in a min-heap, so a member always gets the lowest free
+    number of the requested pool. The locker layout and a snapshot of the assignments live in lockers.json;
+    every assignment and release is appended to a journal file instead of rewriting lockers.json. The journal
+    is written under a file lock and other processes (entrance terminals) replay the new journal lines before
+    they allocate, so two terminals never hand out the same locker. compact() folds the journal back into the
+    snapshot and starts a new journal. Every compaction increments a generation number kept in lockers.json
+    and in the header line of the journal; a terminal that finds another generation in the journal reloads
+    the snapshot.
+
+    Parameters:
+    - filename (str): Locker layout and assignment snapshot.
+    - journal_filename (str): Append-only journal of assignments and releases.
+
+    Usage:
+    ```
+    lockers = LockerAllocator()
+    locker = lockers.assign('001', zone='F', size='S')
+    print(locker)
+    lockers.release(user_id='001')
+    ```
+    """
+    def __init__(self, filename: str = LOCKERS_DATA, journal_filename: str = LOCKERS_JOURNAL):
+        self.filename = filename
+        self.journal_filename = journal_filename
+        self._lock = threading.Lock()
+        if not os.path.exists(filename):
+            self.create_lockers_file()
+        with self._file_lock():
+            self._load()
+
+    def create_lockers_file(self, zones: dict = None):
+        """
+        Create a new lockers JSON file with the given locker layout and no assignments.
+
+        Parameters:
+        - zones (dict, optional): zone -> size -> [first, last] locker numbers. Defaults to DEFAULT_LOCKER_ZONES.
+
+        Returns:
+        str: Confirmation message if the file is created successfully.
+        """
+        data = {"zones": zones or DEFAULT_LOCKER_ZONES, "assigned": {}}
+        try:
+            with open(self.filename, "w") as json_file:
+                json.dump(data, json_file, indent=4)
+            if os.path.exists(self.journal_filename):
+                os.remove(self.journal_filename)
+            return f"File '{self.filename}' created successfully."
+        except Exception as e:
+            return f"Error creating file '{self.filename}': {e}"
+
+    def _load(self):
+        """Load the snapshot and replay the whole journal, caller holds the file lock."""
+        with open(self.filename, 'r') as json_file:
+            data = json.load(json_file)
+
+        self.zones = data["zones"]
+        self._pool_of = {}
+        self._free = {}
+        self._free_heap = {}
+        for zone, sizes in self.zones.items():
+            for size, (first, last) in sizes.items():
+                pool = (zone, size)
+                self._free[pool] = set(range(first, last + 1))
+                self._free_heap[pool] = list(range(first, last + 1))
+                for locker in range(first, last + 1):
+                    self._pool_of[locker] = pool
+
+        self._assigned = {}
+        self._member_locker = {}
+        for locker, user_id in data["assigned"].items():
+            self._apply({"op": "assign", "locker": int(locker), "user_id": user_id})
+
+        self._generation = data.get("generation", 0)
+        generation, self._journal_offset = self._journal_header()
+        if generation != self._generation:
+            # no journal yet, or one left behind by a compaction interrupted after the snapshot was written
+            self._start_journal()
+        self._replay_journal()
+
+    def _journal_header(self):
+        """
+        Generation of the journal and the length of its header line in bytes. A journal without a header line
+        has generation 0, a missing journal None.
+        """
+        try:
+            with open(self.journal_filename, 'rb') as journal_file:
+                line = journal_file.readline()
+        except FileNotFoundError:
+            return None, 0
+        if line.endswith(b'\n'):
+            header = json.loads(line)
+            if "generation" in header:
+                return header["generation"], len(line)
+        return 0, 0
+
+    def _start_journal(self):
+        """Replace the journal with an empty one of the current generation, caller holds the file lock."""
+        header = json.dumps({"generation": self._generation}) + '\n'
+        new_journal = self.journal_filename + '.new'
+        with open(new_journal, 'w') as journal_file:
+            journal_file.write(header)
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        os.replace(new_journal, self.journal_filename)
+        self._journal_offset = len(header.encode())
+
+    def _apply(self, event):
+        locker = event["locker"]
+        if event["op"] == "assign":
+            self._free[self._pool_of[locker]].discard(locker)
+            self._assigned[locker] = event["user_id"]
+            self._member_locker[event["user_id"]] = locker
+        else:
+            user_id = self._assigned.pop(locker, None)
+            if user_id is not None and self._member_locker.get(user_id) == locker:
+                del self._member_locker[user_id]
+            pool = self._pool_of[locker]
+            if locker not in self._free[pool]:
+                self._free[pool].add(locker)
+                heapq.heappush(self._free_heap[pool], locker)
+
+    def _replay_journal(self):
+        """Apply journal lines written since the last replay, possibly by other processes; caller holds the lock."""
+        generation, _ = self._journal_header()
+        if generation != self._generation or os.path.getsize(self.journal_filename) < self._journal_offset:
+            # journal was compacted or recreated by another process, start over from the new snapshot
+            self._load()
+            return
+
+        with open(self.journal_filename, 'rb') as journal_file:
+            journal_file.seek(self._journal_offset)
+            for line in journal_file:
+                if not line.endswith(b'\n'):
+                    break
+                self._apply(json.loads(line))
+                self._journal_offset += len(line)
+
+    @contextmanager
+    def _file_lock(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.journal_filename + '.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _journal_lock(self):
+        with self._file_lock():
+            self._replay_journal()
+            yield
+
+    def _append(self, event):
+        line = json.dumps(event) + '\n'
+        with open(self.journal_filename, 'a') as journal_file:
+            journal_file.write(line)
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        self._journal_offset += len(line.encode())
+        self._apply(event)
+
+    def _pools(self, zone, size):
+        for pool_zone, sizes in self.zones.items():
+            if zone is not None and pool_zone != zone:
+                continue
+            for pool_size in sizes:
+                if size is None or pool_size == size:
+                    yield (pool_zone, pool_size)
+
+    def assign(self, user_id: str, zone: str = None, size: str = None):
+        """
+        Assign the lowest free locker of the requested zone and size to a member.
+
+        Parameters:
+        - user_id (str): Gym member ID.
+        - zone (str, optional): Locker zone, any zone if None.
+        - size (str, optional): Locker size, any size if None.
+
+        Returns:
+        int or None: The locker number (the member's current locker if one is already assigned), or None
+        if no locker is free.
+
+        Usage:
+        ```
+        locker = LockerAllocator().assign('001', zone='M')
+        print(locker)
+        ```
+        """
+        with self._journal_lock():
+            if user_id in self._member_locker:
+                return self._member_locker[user_id]
+            for pool in self._pools(zone, size):
+                free, free_heap = self._free[pool], self._free_heap[pool]
+                while free_heap:
+                    locker = heapq.heappop(free_heap)
+                    if locker in free:
+                        self._append({"op": "assign", "locker": locker, "user_id": user_id})
+                        return locker
+        return None
+
+    def release(self, locker: int = None, user_id: str = None):
+        """
+        Release a locker, given either its number or the member it is assigned to.
+
+        Returns:
+        int or None: The released locker number, or None if nothing was assigned.
+
+        Usage:
+        ```
+        released = LockerAllocator().release(user_id='001')
+        print(released)
+        ```
+        """
+        with self._journal_lock():
+            if locker is None:
+                locker = self._member_locker.get(user_id)
+            if locker is None or locker not in self._assigned:
+                return None
+            self._append({"op": "release", "locker": locker})
+            return locker
+
+    def get_member_locker(self, user_id: str):
+        """Locker number assigned to a member, or None."""
+        return self._member_locker.get(user_id)
+
+    def get_locker_member(self, locker: int):
+        """Member ID the locker is assigned to, or None."""
+        return self._assigned.get(locker)
+
+    def available(self, zone: str = None, size: str = None):
+        """
+        Number of free lockers of the given zone and size.
+
+        Usage:
+        ```
+        print(LockerAllocator().available(zone='F'))
+        ```
+        """
+        return sum(len(self._free[pool]) for pool in self._pools(zone, size))
+
+    def compact(self):
+        """
+        Fold the journal into the lockers.json snapshot and start a new, empty journal of the next generation.
+
+        Returns:
+        str: Confirmation message, or None if the snapshot could not be written.
+        """
+        with self._journal_lock():
+            assigned = {str(locker): user_id for locker, user_id in sorted(self._assigned.items())}
+            # the snapshot is written first, a journal of an older generation is then already folded in
+            if JSONData(self.filename).write_many([(["assigned"], assigned),
+                                                   (["generation"], self._generation + 1)]) is None:
+                return None
+            self._generation += 1
+            self._start_journal()
+        return f"'{self.filename}' compacted, {len(assigned)} lockers assigned"
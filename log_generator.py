@@ -0,0 +1,207 @@
+import json
+
+import numpy as np
+
+from data.database import DataManager
+from payment import INSERT_ACCESS_SESSION_QUERY, INSERT_MEMBERSHIP_PAYMENT_QUERY
+
+
+# membership type -> (duration in days, price)
+DEFAULT_MEMBERSHIP_TYPES = {
+    '1_month': (30, 5000),
+    '3_months': (90, 12000),
+    '12_months': (365, 40000),
+}
+DEFAULT_MEMBERSHIP_WEIGHTS = (0.6, 0.3, 0.1)
+
+# relative number of entrances per hour of the day, morning and after-work peaks
+DEFAULT_HOUR_WEIGHTS = (0, 0, 0, 0, 0, 0, 3, 6, 5, 3, 2, 2, 2, 2, 2, 3, 5, 8, 9, 7, 4, 2, 0, 0)
+
+
+class HistoryGenerator:
+    """
+    Seeded generator of realistic membership payment and gym access history.
+
+    For every member a chain of memberships is drawn from the start date on: the membership type follows
+    `membership_weights`, after each membership the member renews with probability 1 - `churn_probability`
+    after an exponentially distributed break. Every member gets a personal visit rate (gamma distributed
+    around `visits_per_week`); visits are spread over the active membership days, entrance hours follow
+    `hour_weights` and session lengths are normally distributed.
+
+    Logs have the formats written by PaymentProcessor.set_membership_log and
+    SetMemberIDCard.set_access_log_timestamp. Members are generated one at a time, so output is streamed in
+    constant memory and the same seed always produces the same history.
+
+    Parameters:
+    - seed (int, optional): Random seed.
+    - start, end (str): Date range of the history, ISO 'YYYY-MM-DD'.
+    - membership_types (dict): membership type -> (duration in days, price).
+    - membership_weights (sequence): Probability of each membership type.
+    - churn_probability (float): Probability that a member does not renew.
+    - mean_renewal_gap (float): Mean break between two memberships in days.
+    - visits_per_week (float): Average visits per week of an active member.
+    - hour_weights (sequence): 24 relative entrance frequencies per hour.
+    - session_minutes (tuple): Mean and standard deviation of the session length in minutes.
+
+    Usage:
+    ```
+    generator = HistoryGenerator(seed=42, start='2021-01-01', end='2023-12-31')
+    generator.write_jsonl('history.jsonl', ['001', '002'])
+    ```
+    """
+    def __init__(self, seed: int = None, start: str = '2021-01-01', end: str = '2023-12-31',
+                 membership_types: dict = None, membership_weights=DEFAULT_MEMBERSHIP_WEIGHTS,
+                 churn_probability: float = 0.25, mean_renewal_gap: float = 10,
+                 visits_per_week: float = 2.5, hour_weights=DEFAULT_HOUR_WEIGHTS, session_minutes=(75, 20)):
+        self.rng = np.random.default_rng(seed)
+        self.start = np.datetime64(start, 'D')
+        self.end = np.datetime64(end, 'D')
+        membership_types = membership_types or DEFAULT_MEMBERSHIP_TYPES
+        self.membership_names = list(membership_types)
+        self.membership_durations = np.array([membership_types[name][0] for name in self.membership_names])
+        self.membership_prices = np.array([membership_types[name][1] for name in self.membership_names])
+        self.membership_weights = np.asarray(membership_weights, dtype=np.float64)
+        self.membership_weights /= self.membership_weights.sum()
+        self.churn_probability = churn_probability
+        self.mean_renewal_gap = mean_renewal_gap
+        self.visits_per_week = visits_per_week
+        self.hour_weights = np.asarray(hour_weights, dtype=np.float64)
+        self.hour_weights /= self.hour_weights.sum()
+        self.session_minutes = session_minutes
+
+    def generate_member_history(self):
+        """
+        Generates the membership and access log of one member.
+
+        Returns:
+        tuple: (membership log dict, access log dict), keyed 1, 2, ... like the logs in the database.
+        """
+        rng = self.rng
+        total_days = int((self.end - self.start).astype(np.int64))
+        day = int(rng.integers(0, max(total_days, 1)))
+
+        starts, types = [], []
+        while day < total_days:
+            membership_type = int(rng.choice(len(self.membership_names), p=self.membership_weights))
+            starts.append(day)
+            types.append(membership_type)
+            if rng.random() < self.churn_probability:
+                break
+            day += int(self.membership_durations[membership_type] + rng.exponential(self.mean_renewal_gap))
+
+        if not starts:
+            return {}, {}
+
+        starts = np.array(starts, dtype=np.int64)
+        types = np.array(types, dtype=np.int64)
+        valid_to = starts + self.membership_durations[types]
+        payment_dates = np.datetime_as_string(self.start + starts, unit='D')
+        valid_to_dates = np.datetime_as_string(self.start + valid_to, unit='D')
+
+        membership_log = {}
+        for key, (payment_date, membership_type, valid_to_date) in enumerate(
+                zip(payment_dates.tolist(), types.tolist(), valid_to_dates.tolist()), start=1):
+            membership_log[key] = {
+                'payment_date': payment_date,
+                'membership_type': self.membership_names[membership_type],
+                'sum_payed': int(self.membership_prices[membership_type]),
+                'membership_valid_to': valid_to_date,
+            }
+
+        active_days = np.concatenate([np.arange(first, min(last, total_days))
+                                      for first, last in zip(starts.tolist(), valid_to.tolist())])
+        visits_per_week = rng.gamma(4.0, self.visits_per_week / 4.0)
+        visit_count = min(rng.poisson(visits_per_week * len(active_days) / 7), len(active_days))
+        visit_days = np.sort(rng.choice(active_days, visit_count, replace=False))
+
+        entrance_seconds = (rng.choice(24, visit_count, p=self.hour_weights) * 3600
+                            + rng.integers(0, 3600, visit_count))
+        duration_seconds = np.maximum(rng.normal(*self.session_minutes, visit_count), 15) * 60
+        entrances = (self.start + visit_days).astype('datetime64[s]') + entrance_seconds
+        exits = entrances + duration_seconds.astype(np.int64)
+
+        access_log = {}
+        for key, (entrance, exit) in enumerate(zip(self._timestamps(entrances), self._timestamps(exits)), start=1):
+            access_log[key] = {'entrance_timestamp': entrance, 'exit_timestamp': exit}
+
+        return membership_log, access_log
+
+    @staticmethod
+    def _timestamps(values):
+        return [value.replace('T', ' ') for value in np.datetime_as_string(values, unit='s').tolist()]
+
+    def iter_history(self, user_ids):
+        """
+        Streams the generated history member by member.
+
+        Parameters:
+        - user_ids (iterable): Gym member IDs, e.g. from RegistrationDataGenerator.generate_members.
+
+        Returns:
+        generator: (user_id, membership log, access log) tuples.
+
+        Usage:
+        ```
+        for user_id, membership_log, access_log in HistoryGenerator(seed=1).iter_history(['001']):
+            print(user_id, len(access_log))
+        ```
+        """
+        for user_id in user_ids:
+            membership_log, access_log = self.generate_member_history()
+            yield user_id, membership_log, access_log
+
+    def write_jsonl(self, filename: str, user_ids):
+        """
+        Writes the generated history to a JSON lines file, one member per line.
+
+        Returns:
+        int: Number of written members.
+        """
+        count = 0
+        with open(filename, 'w') as jsonl_file:
+            for user_id, membership_log, access_log in self.iter_history(user_ids):
+                jsonl_file.write(json.dumps({'user_id': user_id, 'membership_log': membership_log,
+                                             'access_log': access_log}) + '\n')
+                count += 1
+        return count
+
+    def save_to_database(self, user_ids, chunk_size: int = 1000, connection_type: str = 'mysql'):
+        """
+        Stores the generated history: payments in P3_membership_payment and sessions in P3_access_session.
+
+        Members are processed chunk_size at a time and every chunk is written with DataManager.save_many,
+        so memory use does not depend on the number of members.
+
+        Returns:
+        list: Per-chunk results of DataManager.save_many for both tables.
+
+        Usage:
+        ```
+        members = (row[0] for row in RegistrationDataGenerator().generate_members(10000, seed=1))
+        HistoryGenerator(seed=1).save_to_database(members)
+        ```
+        """
+        database = DataManager(connection_type)
+        results = []
+        payment_rows, session_rows = [], []
+        members = 0
+        for user_id, membership_log, access_log in self.iter_history(user_ids):
+            for key, log in membership_log.items():
+                payment_rows.append((user_id, key, log['payment_date'], log['membership_type'],
+                                     log['sum_payed'], log['membership_valid_to']))
+            for session in access_log.values():
+                session_rows.append((user_id, session['entrance_timestamp'], session['exit_timestamp']))
+            members += 1
+            if members == chunk_size:
+                results += self._save_rows(database, INSERT_MEMBERSHIP_PAYMENT_QUERY, payment_rows)
+                results += self._save_rows(database, INSERT_ACCESS_SESSION_QUERY, session_rows)
+                payment_rows, session_rows, members = [], [], 0
+        results += self._save_rows(database, INSERT_MEMBERSHIP_PAYMENT_QUERY, payment_rows)
+        results += self._save_rows(database, INSERT_ACCESS_SESSION_QUERY, session_rows)
+        return results
+
+    @staticmethod
+    def _save_rows(database, sql_query, rows):
+        if not rows:
+            return []
+        return database.save_many(sql_query, rows, batch_size=len(rows))
@@ -0,0 +1,297 @@
+import threading
+
+from datetime import datetime, timedelta
+from data.database import DataManager, SingletonDatabase
+from data.id_card_store import ID_CARDS_DATA, IDCardStore
+
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# order of the rebuild events within one second
+EXIT, ENTRANCE, INSTANT_EXIT = 0, 1, 2
+
+
+def to_datetime(value):
+    """Timestamp as datetime, from a datetime or a 'YYYY-MM-DD HH:MM:SS' string; None stays None."""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.strptime(str(value)[:19], TIMESTAMP_FORMAT)
+
+
+class OccupancyTracker(metaclass=SingletonDatabase):
+    """
+    Number of members in the building, updated in O(1) by every entrance and exit.
+
+    Members inside are kept as user_id -> entrance time. Entrances, exits and the peak occupancy of the last
+    `window_minutes` minutes are counted in a ring buffer with one slot per minute, so histograms of the recent
+    past need no database access. On start the state is rebuilt: the members inside are the cards of the
+    gates' IDCardStore with an entrance that is less than `max_session_hours` old (sessions are only written to
+    P3_access_session on exit), and the window is filled with one streaming pass over the recent sessions.
+
+    Gates check the capacity and count the entrance in one step with try_enter(). The tracker counts the
+    events of its own process; call rebuild() to pick up entrances and exits of gates in other processes.
+
+    Parameters:
+    - capacity (int, optional): Maximum number of members inside, no limit if None.
+    - window_minutes (int): Length of the per-minute histogram window.
+    - max_session_hours (float): Sessions open longer than this are considered forgotten badge-outs.
+    - connection_type (str): The type of database connection ('mysql', 'postgresql' or 'sqlite').
+    - id_cards_filename (str): Persistence file of the gates' IDCardStore.
+    - rebuild (bool): Rebuild from the ID cards and access sessions when the tracker is created.
+
+    Usage:
+    ```
+    occupancy = OccupancyTracker(capacity=120)
+    if occupancy.try_enter('001'):
+        print("Welcome")
+    print(occupancy.occupancy(), occupancy.histogram(15))
+    ```
+    """
+    def __init__(self, capacity: int = None, window_minutes: int = 1440, max_session_hours: float = 12,
+                 connection_type: str = 'mysql', id_cards_filename: str = ID_CARDS_DATA, rebuild: bool = True):
+        if window_minutes < 1:
+            raise ValueError("window_minutes must be a positive integer")
+        self.capacity = capacity
+        self.window_minutes = window_minutes
+        self.max_session_hours = max_session_hours
+        self.connection_type = connection_type
+        self.id_cards_filename = id_cards_filename
+        self._lock = threading.Lock()
+        self._reset()
+        if rebuild:
+            self.rebuild()
+
+    def _reset(self):
+        self._inside = {}
+        self._minute = [None] * self.window_minutes
+        self._entrances = [0] * self.window_minutes
+        self._exits = [0] * self.window_minutes
+        self._peak = [0] * self.window_minutes
+        self.metrics = {'entrances': 0, 'exits': 0, 'duplicate_entrances': 0, 'unknown_exits': 0, 'full': 0,
+                        'stale_sessions': 0, 'peak': 0}
+
+    @staticmethod
+    def _minute_of(when):
+        return int(when.timestamp() // 60)
+
+    def _slot(self, minute):
+        """Ring buffer slot of an epoch minute, cleared if it still holds an older minute; caller holds the lock."""
+        slot = minute % self.window_minutes
+        if self._minute[slot] != minute:
+            self._minute[slot] = minute
+            self._entrances[slot] = self._exits[slot] = 0
+            self._peak[slot] = len(self._inside)
+        return slot
+
+    def _enter(self, user_id, when, counted=True):
+        self._inside[user_id] = when
+        if counted:
+            slot = self._slot(self._minute_of(when))
+            self._entrances[slot] += 1
+            self._peak[slot] = max(self._peak[slot], len(self._inside))
+        self.metrics['peak'] = max(self.metrics['peak'], len(self._inside))
+
+    def _leave(self, user_id, when, counted=True):
+        del self._inside[user_id]
+        if counted:
+            self._exits[self._slot(self._minute_of(when))] += 1
+
+    def record_entrance(self, user_id: str, when=None):
+        """
+        Count a member entering the building.
+
+        Parameters:
+        - user_id (str): Gym member ID.
+        - when (datetime or str, optional): Entrance time, defaults to now.
+
+        Returns:
+        bool: False if the member was already inside and the entrance is not counted again.
+        """
+        when = to_datetime(when) or datetime.now()
+        with self._lock:
+            if user_id in self._inside:
+                self.metrics['duplicate_entrances'] += 1
+                return False
+            self._enter(user_id, when)
+            self.metrics['entrances'] += 1
+        return True
+
+    def try_enter(self, user_id: str, when=None):
+        """
+        Check the capacity and count the entrance in one step, so concurrent gates cannot overfill the gym.
+
+        Parameters:
+        - user_id (str): Gym member ID.
+        - when (datetime or str, optional): Entrance time, defaults to now.
+
+        Returns:
+        bool: True if the member entered or was already inside, False if the gym is full.
+        """
+        when = to_datetime(when) or datetime.now()
+        with self._lock:
+            if user_id in self._inside:
+                # a second badge does not need a free place
+                self.metrics['duplicate_entrances'] += 1
+                return True
+            if self.capacity is not None and len(self._inside) >= self.capacity:
+                self.metrics['full'] += 1
+                return False
+            self._enter(user_id, when)
+            self.metrics['entrances'] += 1
+        return True
+
+    def record_exit(self, user_id: str, when=None):
+        """
+        Count a member leaving the building.
+
+        Parameters:
+        - user_id (str): Gym member ID.
+        - when (datetime or str, optional): Exit time, defaults to now.
+
+        Returns:
+        bool: False if the member was not counted as inside.
+        """
+        when = to_datetime(when) or datetime.now()
+        with self._lock:
+            if user_id not in self._inside:
+                self.metrics['unknown_exits'] += 1
+                return False
+            self._leave(user_id, when)
+            self.metrics['exits'] += 1
+        return True
+
+    def occupancy(self):
+        """Number of members inside."""
+        return len(self._inside)
+
+    def is_inside(self, user_id: str):
+        """True if the member is counted as inside."""
+        return user_id in self._inside
+
+    def has_capacity(self, members: int = 1):
+        """
+        Check whether `members` more members may enter without exceeding the capacity; gates admitting a
+        member use try_enter() instead, which checks and counts atomically.
+
+        Usage:
+        ```
+        if not OccupancyTracker().has_capacity():
+            print("The gym is full")
+        ```
+        """
+        return self.capacity is None or len(self._inside) + members <= self.capacity
+
+    def expire_stale(self, now: datetime = None):
+        """
+        Count members inside longer than `max_session_hours` as gone; runs over all members inside, call it
+        periodically rather than per event.
+
+        Returns:
+        int: Number of members removed.
+        """
+        now = now or datetime.now()
+        stale_before = now - timedelta(hours=self.max_session_hours)
+        with self._lock:
+            stale = [user_id for user_id, entrance in self._inside.items() if entrance < stale_before]
+            for user_id in stale:
+                self._leave(user_id, now)
+            self.metrics['stale_sessions'] += len(stale)
+        return len(stale)
+
+    def histogram(self, minutes: int = 60, now: datetime = None):
+        """
+        Per-minute entrances, exits and peak occupancy of the last `minutes` minutes.
+
+        Parameters:
+        - minutes (int): Number of minutes, at most window_minutes.
+        - now (datetime, optional): Last minute of the histogram, defaults to now.
+
+        Returns:
+        list: (minute datetime, entrances, exits, peak occupancy) tuples, oldest first.
+        """
+        minutes = min(minutes, self.window_minutes)
+        last_minute = self._minute_of(now or datetime.now())
+        histogram = []
+        with self._lock:
+            # walk back from the current occupancy, undoing the events of every minute
+            occupancy = len(self._inside)
+            for minute in range(last_minute, last_minute - minutes, -1):
+                slot = minute % self.window_minutes
+                if self._minute[slot] == minute:
+                    entrances, exits, peak = self._entrances[slot], self._exits[slot], self._peak[slot]
+                else:
+                    entrances, exits, peak = 0, 0, occupancy
+                histogram.append((datetime.fromtimestamp(minute * 60), entrances, exits, max(peak, occupancy)))
+                occupancy += exits - entrances
+        histogram.reverse()
+        return histogram
+
+    def rebuild(self, rows=None, entrances=None, now: datetime = None):
+        """
+        Rebuild the members inside from the ID cards and the histogram window from the access sessions.
+
+        Parameters:
+        - rows (iterable, optional): Finished sessions as (user_id, entrance_timestamp, exit_timestamp) rows.
+          Streamed in one pass from the sessions of P3_access_session that can overlap the window if omitted.
+        - entrances (iterable, optional): (user_id, entrance timestamp) of the members inside, from
+          IDCardStore.entrances() if omitted.
+        - now (datetime, optional): Current time, defaults to now.
+
+        Returns:
+        int or None: Number of members inside, None if the sessions could not be read; the tracker then keeps
+        its current state.
+        """
+        now = now or datetime.now()
+        window_start = now - timedelta(minutes=self.window_minutes)
+        stale_before = now - timedelta(hours=self.max_session_hours)
+        if entrances is None:
+            entrances = IDCardStore(self.id_cards_filename).entrances()
+        if rows is None:
+            rows = DataManager(self.connection_type).iter_data(
+                "SELECT user_id, entrance_timestamp, exit_timestamp FROM P3_access_session "
+                "WHERE entrance_timestamp >= %s", (window_start - timedelta(hours=self.max_session_hours),))
+
+        events = []
+        try:
+            for user_id, entrance, exit in rows:
+                # sessions are stored on exit, members still inside are on their ID cards
+                if exit is None:
+                    continue
+                entrance, exit = to_datetime(entrance), to_datetime(exit)
+                if exit >= window_start:
+                    events.append((entrance, ENTRANCE, user_id))
+                    # a session entered and left within one second exits after its own entrance
+                    events.append((exit, EXIT if exit > entrance else INSTANT_EXIT, user_id))
+        except Exception as e:
+            print(f"Error rebuilding the occupancy from the access sessions: {e}")
+            return None
+        for user_id, entrance in entrances:
+            entrance = to_datetime(entrance)
+            if entrance >= stale_before:
+                events.append((entrance, ENTRANCE, user_id))
+        # exits sort before entrances of the same second
+        events.sort()
+
+        with self._lock:
+            self._reset()
+            for when, kind, user_id in events:
+                counted = when >= window_start
+                if kind == ENTRANCE:
+                    if user_id not in self._inside:
+                        self._enter(user_id, when, counted)
+                elif user_id in self._inside:
+                    self._leave(user_id, when, counted)
+            return len(self._inside)
+
+    def stats(self):
+        """
+        Occupancy metrics.
+
+        Returns:
+        dict: Current occupancy, capacity, entrances and exits since the last rebuild, duplicate entrances,
+        exits without an entrance, entrances refused while full, stale sessions and the highest occupancy seen.
+        """
+        with self._lock:
+            stats = dict(self.metrics)
+            stats['occupancy'] = len(self._inside)
+        stats['capacity'] = self.capacity
+        return stats
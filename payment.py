@@ -3,8 +3,32 @@ import json
 
 from datetime import datetime, timedelta
 from data.data import PI5_DATA
-from data.database import DatabaseManager
-from data.json_data_manager import JSONData, DateEncoder
+from data.async_database import AsyncDataManager
+from data.database import DataManager, is_duplicate_key_error
+from data.json_data_manager import JSONData
+from data.membership_index import MembershipIndex
+
+
+MEMBERSHIP_DATA = 'data/memebrship_data.json'
+ID_CARD_DATA = 'data/gym_id_card.json'
+
+MEMBERSHIP_PAYMENT_COLUMNS = "user_id, log_key, payment_date, membership_type, sum_payed, membership_valid_to"
+INSERT_MEMBERSHIP_PAYMENT_QUERY = f"INSERT INTO P3_membership_payment ({MEMBERSHIP_PAYMENT_COLUMNS}) " \
+                                  "VALUES (%s, %s, %s, %s, %s, %s)"
+MEMBERSHIP_LOG_KEY_QUERY = "SELECT MAX(log_key) from P3_membership_payment WHERE user_id = %s"
+# attempts of register_payment when a concurrent payment of the same member takes the log key
+PAYMENT_KEY_ATTEMPTS = 5
+LAST_MEMBERSHIP_LOG_KEYS_QUERY = "SELECT user_id, MAX(log_key) from P3_membership_payment GROUP BY user_id"
+MEMBER_USER_ID_QUERY = "SELECT user_id from P3_user WHERE JMBG = %s"
+
+ACCESS_SESSION_COLUMNS = "user_id, entrance_timestamp, exit_timestamp"
+INSERT_ACCESS_SESSION_QUERY = f"INSERT INTO P3_access_session ({ACCESS_SESSION_COLUMNS}) VALUES (%s, %s, %s)"
+# last session of a member and the number of sessions, which is its key in the access log
+LAST_ACCESS_SESSION_QUERY = "SELECT s.user_id, s.entrance_timestamp, s.exit_timestamp, c.sessions " \
+                            "from P3_access_session s JOIN (SELECT user_id, COUNT(*) AS sessions, " \
+                            "MAX(entrance_timestamp) AS last_entrance from P3_access_session " \
+                            "WHERE user_id = %s GROUP BY user_id) c " \
+                            "ON s.user_id = c.user_id AND s.entrance_timestamp = c.last_entrance"
 
 
 class GymMembershipData:
@@ -49,9 +73,8 @@ class GymMembershipData:
 
 class PaymentProcessor:
     def __init__(self):
-        self.database = DatabaseManager('mysql')
+        self.database = DataManager('mysql')
         self.membership_log = {'payment_date':'', 'membership_type':'', 'sum_payed':0, 'membership_valid_to': ''}
-        self.data_log = {}
 
     def get_member_user_id(self, jmbg: str) -> str: 
         """
@@ -67,7 +90,7 @@ class PaymentProcessor:
         ```
 
         """
-        member_id = self.database.read_data_sql_query(f"SELECT user_id from user WHERE JMBG = '{jmbg}'")
+        member_id = self.database.read_data(MEMBER_USER_ID_QUERY, (jmbg,), cached=True, prepared=True)
         return member_id[0][0]
        
     def get_membership_log_key(self, user_id: str):
@@ -84,14 +107,8 @@ class PaymentProcessor:
         ```
 
         """
-        data = self.database.read_data_sql_query("SELECT membership_log from P3_user_log WHERE user_id = %s" % user_id)
-        if data == ():
-            self.data_log = {}
-            return 1
-        else:
-            self.data_log =  json.loads(data[0][0])
-            converted_dict = {int(key): value for key, value in self.data_log.items()}
-            return max(converted_dict, key=int) + 1
+        data = self.database.read_data(MEMBERSHIP_LOG_KEY_QUERY, (user_id,), primary=True, prepared=True)
+        return next_membership_log_key(data)
 
     def set_membership_log(self, membership_type: str, sum: float):
         """
@@ -122,8 +139,12 @@ class PaymentProcessor:
         """
         registers membership payment and stores generated new membership payment log
 
+        The payment is appended as a new row of P3_membership_payment, earlier payments are not rewritten. The
+        log key is read and the row inserted in one transaction; if a payment of the same member at another desk
+        takes the key first, the payment is retried with the next key.
+
         Returns: 
-        str: A confirmation message indicating that the payment is finished.
+        str: A confirmation message indicating that the payment is finished, None if it could not be stored.
 
         Usage:
         ```
@@ -132,22 +153,245 @@ class PaymentProcessor:
         ```
 
         """
-        membership_key = self.get_membership_log_key(user_id)
         membership_log_data = self.set_membership_log(membership_type, sum)
-        self.data_log.update({membership_key: membership_log_data})
-        log = json.dumps(self.data_log, cls=DateEncoder)
-        
-        if membership_key == 1:
-            sql_query = f"INSERT INTO P3_user_log (user_id, membership_log) VALUES (%s, %s)"
-            data = (user_id, log)
-        else:
-            sql_query = "UPDATE P3_user_log SET membership_log = %s WHERE user_id = %s"
-            data = (log, user_id)
+        if self._store_payment(self.database, user_id, membership_log_data) is None:
+            return None
+
+        MembershipIndex().update(user_id, membership_log_data['membership_valid_to'])
+        return f'Payment for the member id {user_id} is finished'
+
+    @staticmethod
+    def _store_payment(database, user_id: str, membership_log_data: dict):
+        """
+        Insert a payment with the member's next log key, retried while concurrent payments take the key.
+
+        Returns:
+        tuple: The stored P3_membership_payment row, None if the payment could not be stored.
+        """
+        for attempt in range(1, PAYMENT_KEY_ATTEMPTS + 1):
+            try:
+                with database.transaction() as cursor:
+                    cursor.execute(MEMBERSHIP_LOG_KEY_QUERY, (user_id,))
+                    membership_key = next_membership_log_key(cursor.fetchall())
+                    data = membership_payment_row(user_id, membership_key, membership_log_data)
+                    cursor.execute(INSERT_MEMBERSHIP_PAYMENT_QUERY, data)
+            except Exception as e:
+                if is_duplicate_key_error(e) and attempt < PAYMENT_KEY_ATTEMPTS:
+                    continue
+                print(f"Error storing the payment for the member id {user_id}: {e}")
+                return None
+            database.cache.invalidate(INSERT_MEMBERSHIP_PAYMENT_QUERY)
+            return data
+
+    def register_payments(self, payments, batch_size: int = 500):
+        """
+        registers many membership payments at once, e.g. for the nightly payment reconciliation
+
+        Log keys are allocated from a single MAX(log_key) per member query and the payments are written
+        with DataManager.save_many, one transaction per chunk.
+
+        Parameters:
+        - payments (iterable): (user_id, membership_type, sum) tuples.
+        - batch_size (int): Number of payments written per transaction.
+
+        Returns: 
+        list: Per-chunk results as returned by DataManager.save_many.
+
+        Usage:
+        ```
+        results = PaymentProcessor().register_payments([('001', '3_months', 12000), ('002', '1_month', 5000)])
+        print(results)
+        ```
+
+        """
+        last_keys = self.database.read_data(LAST_MEMBERSHIP_LOG_KEYS_QUERY, primary=True)
+        rows = self._payment_rows(payments, last_keys)
+        results = self.database.save_many(INSERT_MEMBERSHIP_PAYMENT_QUERY, rows, batch_size=batch_size)
+        self._update_membership_index(rows, results)
+        return results
+
+    def _payment_rows(self, payments, last_keys):
+        """Builds P3_membership_payment rows, continuing every member's log keys from last_keys."""
+        last_keys = dict(last_keys or ())
+        rows = []
+        for user_id, membership_type, sum in payments:
+            last_keys[user_id] = (last_keys.get(user_id) or 0) + 1
+            membership_log_data = dict(self.set_membership_log(membership_type, sum))
+            rows.append(membership_payment_row(user_id, last_keys[user_id], membership_log_data))
+        return rows
+
+    @staticmethod
+    def _update_membership_index(rows, results):
+        """Adds the saved payment rows to the MembershipIndex, skipping rows save_many reported as failed."""
+        failed = {idx for result in results for idx, _ in result['failed']}
+        membership_index = MembershipIndex()
+        for idx, row in enumerate(rows):
+            if idx not in failed:
+                membership_index.update(row[0], row[5])
+
+
+def next_membership_log_key(data):
+    """Next log key from the result of MEMBERSHIP_LOG_KEY_QUERY, 1 for a member without payments."""
+    if not data or data[0][0] is None:
+        return 1
+    return data[0][0] + 1
+
+
+def membership_payment_row(user_id: str, log_key: int, membership_log: dict):
+    """
+    Converts a membership log entry into a P3_membership_payment row
+
+    Returns: 
+    tuple: (user_id, log_key, payment_date, membership_type, sum_payed, membership_valid_to)
+
+    """
+    return (user_id, log_key, membership_log['payment_date'], membership_log['membership_type'],
+            membership_log['sum_payed'], membership_log['membership_valid_to'])
+
+
+def membership_logs_from_rows(rows):
+    """
+    Groups P3_membership_payment rows into per-member membership logs
+
+    The logs have the same shape as the former P3_user_log.membership_log JSON:
+    {log_key: {'payment_date', 'membership_type', 'sum_payed', 'membership_valid_to'}}.
+
+    Parameters:
+    - rows (iterable): (user_id, log_key, payment_date, membership_type, sum_payed, membership_valid_to) rows.
+
+    Returns: 
+    dict: user_id -> membership log, in row order.
+
+    """
+    logs = {}
+    for user_id, log_key, payment_date, membership_type, sum_payed, membership_valid_to in rows:
+        logs.setdefault(user_id, {})[log_key] = {
+            'payment_date': str(payment_date),
+            'membership_type': membership_type,
+            'sum_payed': float(sum_payed) if sum_payed is not None else 0,
+            'membership_valid_to': str(membership_valid_to),
+        }
+    return logs
+
+
+def access_session_row(user_id: str, access_log: dict):
+    """
+    Converts an ID card access log into a P3_access_session row
+
+    Returns: 
+    tuple: (user_id, entrance_timestamp, exit_timestamp)
+
+    """
+    return (user_id, access_log['entrance_timestamp'], access_log.get('exit_timestamp'))
 
-        self.database.save_data(sql_query, data)
 
+def access_logs_from_rows(rows):
+    """
+    Groups P3_access_session rows into per-member access logs
+
+    The logs have the same shape as the former P3_user_log.access_log JSON:
+    {session_key: {'entrance_timestamp', 'exit_timestamp'}}, sessions numbered from 1 in row order unless the
+    row carries its session key as fourth column.
+
+    Parameters:
+    - rows (iterable): (user_id, entrance_timestamp, exit_timestamp[, session_key]) rows, ordered by entrance.
+
+    Returns: 
+    dict: user_id -> access log, in row order.
+
+    """
+    logs = {}
+    for row in rows:
+        user_id, entrance_timestamp, exit_timestamp = row[:3]
+        log = logs.setdefault(user_id, {})
+        log[row[3] if len(row) > 3 else len(log) + 1] = {
+            'entrance_timestamp': str(entrance_timestamp),
+            'exit_timestamp': str(exit_timestamp) if exit_timestamp is not None else None,
+        }
+    return logs
+
+
+class AccessSessionLog:
+    """
+    Writes finished gym sessions to the append-only P3_access_session table.
+
+    Every session is one inserted row keyed by (user_id, entrance_timestamp); earlier sessions are never
+    read or rewritten.
+
+    Usage:
+    ```
+    AccessSessionLog().record_session('001', GetMemberIDCardData().get_member_access_log())
+    ```
+    """
+    def __init__(self):
+        self.database = DataManager('mysql')
+
+    def record_session(self, user_id: str, access_log: dict):
+        """
+        Stores one session from the ID card access log.
+
+        Parameters:
+        - user_id (str): Gym member ID.
+        - access_log (dict): 'entrance_timestamp' and 'exit_timestamp' of the session.
+
+        Returns:
+        None if an error occurs, otherwise a confirmation message.
+        """
+        return self.database.save_data(INSERT_ACCESS_SESSION_QUERY, access_session_row(user_id, access_log))
+
+    def record_sessions(self, sessions, batch_size: int = 500):
+        """
+        Stores many sessions in chunks, e.g. from several gates at once.
+
+        Parameters:
+        - sessions (iterable): (user_id, access_log dict) tuples.
+        - batch_size (int): Number of sessions written per transaction.
+
+        Returns:
+        list: Per-chunk results as returned by DataManager.save_many.
+        """
+        rows = (access_session_row(user_id, access_log) for user_id, access_log in sessions)
+        return self.database.save_many(INSERT_ACCESS_SESSION_QUERY, rows, batch_size=batch_size)
+
+
+class AsyncPaymentProcessor(PaymentProcessor):
+    """
+    Asyncio counterpart of PaymentProcessor, queries run through AsyncDataManager.
+
+    Usage:
+    ```
+    message = await AsyncPaymentProcessor().register_payment('001', '3_months', 12000)
+    print(message)
+    ```
+    """
+    def __init__(self):
+        super().__init__()
+        self.database = AsyncDataManager('mysql')
+
+    async def get_member_user_id(self, jmbg: str) -> str:
+        member_id = await self.database.read_data(MEMBER_USER_ID_QUERY, (jmbg,), cached=True, prepared=True)
+        return member_id[0][0]
+
+    async def get_membership_log_key(self, user_id: str):
+        data = await self.database.read_data(MEMBERSHIP_LOG_KEY_QUERY, (user_id,), primary=True, prepared=True)
+        return next_membership_log_key(data)
+
+    async def register_payment(self, user_id: str, membership_type: str, sum: float):
+        membership_log_data = dict(self.set_membership_log(membership_type, sum))
+        data = await self.database.run(self._store_payment, self.database.manager, user_id, membership_log_data)
+        if data is None:
+            return None
+
+        MembershipIndex().update(user_id, data[5])
         return f'Payment for the member id {user_id} is finished'
 
+    async def register_payments(self, payments, batch_size: int = 500):
+        last_keys = await self.database.read_data(LAST_MEMBERSHIP_LOG_KEYS_QUERY, primary=True)
+        rows = self._payment_rows(payments, last_keys)
+        results = await self.database.save_many(INSERT_MEMBERSHIP_PAYMENT_QUERY, rows, batch_size=batch_size)
+        self._update_membership_index(rows, results)
+        return results
+
 
 class LogExtractor:
     def __init__(self, log_type: str = 'M'):
@@ -166,16 +410,65 @@ class LogExtractor:
         if log_type not in ('M', 'A'):
             raise ValueError("log_type must be 'M' or 'A'")
         
-        self.database = DatabaseManager('mysql')
+        self.database = DataManager('mysql')
         self.log_type = log_type
-        
-        if log_type == 'M':
-            self.user_data = self.database.read_data_sql_query("SELECT user_id, membership_log from P3_user_log")
-        else:
-            self.user_data = self.database.read_data_sql_query("SELECT user_id, access_log from P3_user_log")
-        
         self.last_log_main_key = None
 
+    def iter_complete_log(self, chunk_size: int = 1000):
+        """
+        Streams complete membership or access log data, one member at a time.
+
+        Rows are read through a server-side cursor in chunks of chunk_size, so exporting the full log runs in
+        constant memory.
+
+        Returns: 
+        generator: (user_id, raw JSON log) tuples.
+
+        Raises:
+        - The database error if the stream fails part way, the logs yielded so far are incomplete.
+
+        Usage:
+        ```
+        for user_id, log in LogExtractor('M').iter_complete_log():
+            print(user_id, log)
+        ```
+        """
+        member_rows = []
+        for row in self.iter_log_rows(chunk_size):
+            if member_rows and member_rows[0][0] != row[0]:
+                yield from self._log_items(member_rows)
+                member_rows = []
+            member_rows.append(row)
+        yield from self._log_items(member_rows)
+
+    def iter_log_rows(self, chunk_size: int = 1000):
+        """
+        Streams the rows of P3_membership_payment or P3_access_session as stored, ordered by member.
+
+        Unlike iter_complete_log, the rows are not grouped into JSON logs, so column-oriented readers such as
+        GymDataAnalysis consume them without serializing and parsing every log.
+
+        Returns: 
+        generator: MEMBERSHIP_PAYMENT_COLUMNS or ACCESS_SESSION_COLUMNS tuples.
+
+        Usage:
+        ```
+        for user_id, entrance_timestamp, exit_timestamp in LogExtractor('A').iter_log_rows():
+            print(user_id, entrance_timestamp, exit_timestamp)
+        ```
+        """
+        return self.database.iter_data(self._complete_log_query(), chunk_size=chunk_size)
+
+    def _complete_log_query(self):
+        if self.log_type == 'A':
+            return f"SELECT {ACCESS_SESSION_COLUMNS} from P3_access_session ORDER BY user_id, entrance_timestamp"
+        return f"SELECT {MEMBERSHIP_PAYMENT_COLUMNS} from P3_membership_payment ORDER BY user_id, log_key"
+
+    def _log_items(self, member_rows):
+        logs_from_rows = access_logs_from_rows if self.log_type == 'A' else membership_logs_from_rows
+        for user_id, log in logs_from_rows(member_rows).items():
+            yield (user_id, json.dumps(log))
+
     def get_complete_log(self):
         """
         Extracts complete membership or access log data depending on the class parameters.
@@ -189,13 +482,55 @@ class LogExtractor:
         print(log)
         ```
         """
-        raw_data = self.user_data
-        return raw_data
+        return list(self.iter_complete_log())
+
+    def _member_log_query(self, last_only: bool):
+        """SQL reading only one member's log, by primary key."""
+        if self.log_type == 'A':
+            if last_only:
+                return LAST_ACCESS_SESSION_QUERY
+            return f"SELECT {ACCESS_SESSION_COLUMNS} from P3_access_session WHERE user_id = %s " \
+                   "ORDER BY entrance_timestamp"
+
+        sql_query = f"SELECT {MEMBERSHIP_PAYMENT_COLUMNS} from P3_membership_payment WHERE user_id = %s"
+        if last_only:
+            return sql_query + " ORDER BY log_key DESC LIMIT 1"
+        return sql_query + " ORDER BY log_key"
+
+    def _parse_member_log(self, user_id: str, data):
+        """Member log dict from the result of _member_log_query. Returns None if there is no log."""
+        if not data:
+            return None
+        if self.log_type == 'A':
+            return access_logs_from_rows(data)[user_id]
+        return membership_logs_from_rows(data)[user_id]
+
+    def _member_log_result(self, user_id: str, user_data, full_log: bool):
+        if user_data is None:
+            return f"There is no log for member with ID {user_id}"
+        elif full_log:
+            return user_data
+        else:
+            last_session = user_data.popitem()
+            self.last_log_main_key = last_session[0]
+            return last_session
+
+    @staticmethod
+    def _parse_log_value(value):
+        # only 'YYYY-MM-DD' strings are dates, other values are returned without a parse attempt
+        if isinstance(value, str) and len(value) == 10 and value[4] == '-' and value[7] == '-':
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                pass
+        return value
 
     def get_member_log(self, user_id: str, full_log: bool):
         """
         Extracts membership or access log data for a specific user.
 
+        Only the requested member's rows are read from the database.
+
         Parameters:
         - user_id (str): Gym member ID.
         - full_log (bool): If True, return the full log data. If False, return the last membership or access session data.
@@ -209,20 +544,8 @@ class LogExtractor:
         print(member_log)
         ```
         """
-        raw_data = self.user_data
-        
-        raw_user_data = [element for element in raw_data if element[0] == user_id][0]
-        if raw_user_data[1] == None:
-            return f"There is no log for member with ID {user_id}"
-        else:
-            user_data_json = [json.loads(element[1]) for element in raw_data if element[0] == user_id][0]
-            user_data = {int(k): v for k, v in user_data_json.items()}
-            if full_log:
-                return user_data
-            else:
-                last_session = user_data.popitem()
-                self.last_log_main_key = last_session[0]
-                return last_session
+        data = self.database.read_data(self._member_log_query(last_only=not full_log), (user_id,), cached=True)
+        return self._member_log_result(user_id, self._parse_member_log(user_id, data), full_log)
         
     def get_last_log_main_key(self, user_id: str):
         """
@@ -264,17 +587,104 @@ class LogExtractor:
         ```
         """
         last_session_data = self.get_member_log(user_id, False)[1]
-        value = last_session_data.get(key)
+        return self._parse_log_value(last_session_data.get(key))
+
+    def _sessions_query(self, start, end, user_id):
+        if self.log_type != 'A':
+            raise ValueError("Sessions are only available for access logs, use LogExtractor('A')")
+        conditions, params = [], []
+        for condition, value in (("user_id = %s", user_id), ("entrance_timestamp >= %s", start),
+                                 ("entrance_timestamp < %s", end)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        sql_query = f"SELECT {ACCESS_SESSION_COLUMNS} from P3_access_session"
+        if conditions:
+            sql_query += " WHERE " + " AND ".join(conditions)
+        return sql_query + " ORDER BY entrance_timestamp", tuple(params)
+
+    @staticmethod
+    def _session_rows(data):
+        return [(user_id, str(entrance_timestamp), str(exit_timestamp) if exit_timestamp is not None else None)
+                for user_id, entrance_timestamp, exit_timestamp in data or ()]
+
+    def get_sessions(self, start=None, end=None, user_id: str = None):
+        """
+        Extracts the gym sessions with an entrance in [start, end), read through the entrance or primary key
+        index without parsing any member's full history.
 
-        try:
-            date_format = "%Y-%m-%d"
-            parsed_date = datetime.strptime(value, date_format)
-            return parsed_date
-        except (json.JSONDecodeError, ValueError):
-            return value
+        Parameters:
+        - start, end (str or datetime, optional): Entrance time range, open-ended if None.
+        - user_id (str, optional): Only the sessions of this member.
+
+        Returns: 
+        list: (user_id, entrance_timestamp, exit_timestamp) tuples ordered by entrance.
+
+        Usage:
+        ```
+        sessions = LogExtractor('A').get_sessions('2024-01-01', '2024-02-01', user_id='001')
+        print(sessions)
+        ```
+        """
+        sql_query, params = self._sessions_query(start, end, user_id)
+        return self._session_rows(self.database.read_data(sql_query, params))
+
+
+class AsyncLogExtractor(LogExtractor):
+    """
+    Asyncio counterpart of LogExtractor, queries run through AsyncDataManager.
+
+    Usage:
+    ```
+    member_log = await AsyncLogExtractor('M').get_member_log('001', full_log=True)
+    async for user_id, log in AsyncLogExtractor('A').iter_complete_log():
+        print(user_id, log)
+    ```
+    """
+    def __init__(self, log_type: str = 'M'):
+        super().__init__(log_type)
+        self.database = AsyncDataManager('mysql')
+
+    async def iter_complete_log(self, chunk_size: int = 1000):
+        member_rows = []
+        async for row in self.iter_log_rows(chunk_size):
+            if member_rows and member_rows[0][0] != row[0]:
+                for item in self._log_items(member_rows):
+                    yield item
+                member_rows = []
+            member_rows.append(row)
+        for item in self._log_items(member_rows):
+            yield item
+
+    async def get_complete_log(self):
+        return [row async for row in self.iter_complete_log()]
+
+    async def get_member_log(self, user_id: str, full_log: bool):
+        data = await self.database.read_data(self._member_log_query(last_only=not full_log), (user_id,),
+                                             cached=True)
+        return self._member_log_result(user_id, self._parse_member_log(user_id, data), full_log)
+
+    async def get_last_log_main_key(self, user_id: str):
+        self.last_log_main_key = None
+        await self.get_member_log(user_id, False)
+        return self.last_log_main_key or 0
+
+    async def get_last_log_key_value(self, user_id: str, key):
+        last_session_data = (await self.get_member_log(user_id, False))[1]
+        return self._parse_log_value(last_session_data.get(key))
+
+    async def get_sessions(self, start=None, end=None, user_id: str = None):
+        sql_query, params = self._sessions_query(start, end, user_id)
+        return self._session_rows(await self.database.read_data(sql_query, params))
 
 
 class SetMemberIDCard:
+    """
+    Writes the single ID card file data/gym_id_card.json of one member at a time, as used at the desk.
+
+    The entrance and exit gates keep the cards of all members inside in data.id_card_store.IDCardStore, see
+    AdmissionEngine.enter and ExitEventQueue.record_card_exit.
+    """
     def __init__(self):
         self.filename = ID_CARD_DATA
     
@@ -384,8 +794,35 @@ class SetMemberIDCard:
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         return JSONData(self.filename).write_json(["access_log", key], now)
 
+    def set_entrance(self, user_id: str, locker: int = None):
+        """
+        Set the member ID, access status, locker number and entrance timestamp in one update of the gym ID card data.
+
+        Parameters:
+        - user_id (str): The user's membership ID.
+        - locker (int, optional): The locker number.
+
+        Returns:
+        str: Confirmation message after updating the data.
+
+        Usage:
+        ```
+        id_card = SetMemberIDCard()
+        result = id_card.set_entrance('001', 123)
+        print(result)
+        ```
+        """
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return JSONData(self.filename).write_many([
+            (["userID"], user_id),
+            (["hasAccess"], True),
+            (["lockerNumber"], locker),
+            (["access_log", "entrance_timestamp"], now),
+        ])
+
 
 class GetMemberIDCardData:
+    """Reads the single ID card file data/gym_id_card.json, see SetMemberIDCard."""
     def __init__(self):
         self.filename = ID_CARD_DATA
 
@@ -451,4 +888,19 @@ class GetMemberIDCardData:
         ```
         """
         return JSONData(self.filename).read_json("access_log")
+
+    def get_card_data(self):
+        """
+        Get all ID card fields with a single read of the ID card data.
+
+        Returns:
+        dict: userID, hasAccess, lockerNumber and access_log.
+
+        Usage:
+        ```
+        card_data = GetMemberIDCardData().get_card_data()
+        print(card_data['hasAccess'], card_data['lockerNumber'])
+        ```
+        """
+        return JSONData(self.filename).read_many(["userID", "hasAccess", "lockerNumber", "access_log"])
   
@@ -1,17 +1,22 @@
 import calendar
-import datetime
-import json
 import random
 
-from datetime import datetime
+import numpy as np
+
 from data.data import PI5_DATA
-from data.database import DatabaseManager
+from data.async_database import AsyncDataManager
+from data.database import DataManager
+from data.member_ids import MemberIdAllocator, format_member_id
+from data.membership_expiry import MembershipExpiryScheduler
 
 
 MEMBERSHIP_DATA = 'data/memebrship_data.json'
 ID_CARD_DATA = 'data/gym_id_card.json'
 LOCKERS_DATA = 'data/lockers.json'
 
+REGISTER_MEMBER_QUERY = "INSERT INTO P3_user (user_id, name, surname, gender, address, city, document_id, JMBG) " \
+                        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
+
 
 class RegistrationDataGenerator:
     def __init__(self) -> None:
@@ -19,8 +24,23 @@ class RegistrationDataGenerator:
         self.surname = PI5_DATA['surnames']
         self.gender = ''
         self.address = PI5_DATA['addresses']
-        self.database = DatabaseManager('mysql')
-        self.user_data = self.database.read_data("P3_user")
+        self.member_ids = MemberIdAllocator('mysql')
+
+    def allocate_member_ids(self, count: int):
+        """
+        Reserves a contiguous block of new gym member IDs from the member ID sequence.
+
+        Returns:
+        int: The first ID of the block, the block is [first, first + count).
+
+        Usage:
+        ```
+        first_id = RegistrationDataGenerator().allocate_member_ids(1000)
+        print(first_id)
+        ```
+
+        """
+        return self.member_ids.allocate(count)
 
     def generate_new_member_id(self):
         """
@@ -36,10 +56,7 @@ class RegistrationDataGenerator:
         ```
 
         """
-        data = [int(x[0]) for x in self.user_data]
-        max_id = max(data) + 1 if data else 1
-        new_user_id = f"{max_id:03d}"
-        return new_user_id
+        return format_member_id(self.member_ids.next_id())
 
     def generate_name(self):
         random_number = random.randint(0, len(self.names)-1)
@@ -89,51 +106,87 @@ class RegistrationDataGenerator:
         ]
         return gym_registration_data
 
+    def generate_members(self, count: int, seed: int = None, chunk_size: int = 100000):
+        """
+        Generates member data for many members at once, e.g. for load tests.
+
+        All random values of a chunk are drawn with vectorized NumPy calls and the member IDs come from one
+        contiguous block reserved with allocate_member_ids. Rows are yielded chunk by chunk, so the result can
+        be streamed straight into GymRegistration.register_members.
+
+        Parameters:
+        - count (int): Number of members to generate.
+        - seed (int, optional): Seed for reproducible data.
+        - chunk_size (int): Number of members generated per vectorized draw.
+
+        Returns:
+        generator: Rows in generate_member_data order
+        (user_id, name, surname, gender, address, city, document_id, jmbg).
+
+        Usage:
+        ```
+        members = RegistrationDataGenerator().generate_members(1000000, seed=1)
+        GymRegistration().register_members(members, batch_size=5000)
+        ```
+
+        """
+        rng = np.random.default_rng(seed)
+        names = np.array([name[0] for name in self.names])
+        genders = np.array([name[1] for name in self.names])
+        surnames = np.array(self.surname)
+        addresses = np.array(self.address)
+        member_id = self.allocate_member_ids(count)
+
+        for chunk_start in range(0, count, chunk_size):
+            size = min(chunk_size, count - chunk_start)
+            user_ids = np.char.zfill(np.arange(member_id, member_id + size).astype(str), 3)
+            member_id += size
+
+            name_index = rng.integers(0, len(names), size)
+            surname_index = rng.integers(0, len(surnames), size)
+            address_index = rng.integers(0, len(addresses), size)
+            document_ids = np.char.zfill(rng.integers(0, 1000000000, size).astype(str), 9)
+
+            year = rng.integers(1970, 2004, size)
+            month = rng.integers(1, 13, size)
+            month_start = (year - 1970) * 12 + (month - 1)
+            max_days = (np.array(month_start + 1, dtype='datetime64[M]').astype('datetime64[D]')
+                        - np.array(month_start, dtype='datetime64[M]').astype('datetime64[D]')).astype(np.int64)
+            day = (rng.random(size) * max_days).astype(np.int64) + 1
+            jmbg = (day * 10 ** 11 + month * 10 ** 9 + (year % 1000) * 10 ** 6
+                    + rng.integers(0, 1000000, size))
+            jmbgs = np.char.zfill(jmbg.astype(str), 13)
+
+            yield from zip(user_ids.tolist(), names[name_index].tolist(), surnames[surname_index].tolist(),
+                           genders[name_index].tolist(), addresses[address_index].tolist(),
+                           ['Novi Sad'] * size, document_ids.tolist(), jmbgs.tolist())
+
 
 class RegisteredUsers:
     def __init__(self) -> None:
-        self.database = DatabaseManager('mysql')
-        self.user_data = self.database.read_data("P3_user")
-        self.membership_data = self.database.read_data("P3_user_log")
+        self.database = DataManager('mysql')
+        self.user_data = self.database.read_data("SELECT user_id, name, surname FROM P3_user", cached=True) or ()
+        self.memberships = MembershipExpiryScheduler()
 
     def users_ids(self):
         return [id[0] for id in self.user_data]
     
     def is_user_active(self, member_id):
-        try:
-            user_log_data = [log_data for log_data in self.membership_data if log_data[0] == member_id]
-            json_data = user_log_data[0][1]
-            parsed_data = json.loads(json_data)
-            max_key = max(parsed_data, key=lambda key: parsed_data[key].get("membership_valid_to"))
-
-            highest_membership_valid_to = parsed_data[max_key]["membership_valid_to"]
-            date_to_compare = datetime.strptime(highest_membership_valid_to, "%Y-%m-%d")
-            current_date = datetime.now()
-
-            if date_to_compare > current_date:
-                return True
-            else:
-                return False
-
-        except (IndexError, ValueError, KeyError):
-            return False
+        return self.memberships.is_active(member_id)
         
     def display_table_data(self):
-        member_data = self.user_data
-        member_ids = self.users_ids()
+        is_active = self.memberships.is_active
 
         table_data = []
-        for idx, member_id in enumerate(member_ids):
-            if member_id == member_data[idx][0]:
-                name = (member_data[idx][1] + ' ' + member_data[idx][2])
-                table_data.append([member_id, name, self.is_user_active(member_id)])
+        for member_id, name, surname in self.user_data:
+            table_data.append([member_id, name + ' ' + surname, is_active(member_id)])
 
         return table_data
 
 
 class GymRegistration:
     def __init__(self):
-       self.database = DatabaseManager('mysql')
+       self.database = DataManager('mysql')
 
     def register_member(self, user_id: str, name: str, surname: str, gender: str, address: str, city: str, document_id: str, jmbg: str):
         """
@@ -150,10 +203,53 @@ class GymRegistration:
 
         """
 
-        sql_query = f"INSERT INTO P3_user (user_id, name, surname, gender, address, city, document_id, JMBG) " \
-                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
         data = (user_id, name, surname, gender, address, city, document_id, jmbg)
-        self.database.save_data(sql_query, data)
+        self.database.save_data(REGISTER_MEMBER_QUERY, data)
+
+        return f"{name} {surname} is registered"
+
+    def register_members(self, members, batch_size: int = 500):
+        """
+        Method for bulk gym member registration, e.g. when importing a franchise member list
+
+        Members are written in chunks of batch_size rows, one transaction per chunk.
+
+        Parameters:
+        - members (iterable): Member rows in register_member argument order
+          (user_id, name, surname, gender, address, city, document_id, jmbg).
+        - batch_size (int): Number of members written per transaction.
+
+        Returns: 
+        list: Per-chunk results as returned by DataManager.save_many.
+
+        Usage:
+        ```
+        results = GymRegistration().register_members([RegistrationDataGenerator().generate_member_data()])
+        print(results)
+        ```
+
+        """
+        return self.database.save_many(REGISTER_MEMBER_QUERY, members, batch_size=batch_size)
+
+
+class AsyncGymRegistration(GymRegistration):
+    """
+    Asyncio counterpart of GymRegistration, queries run through AsyncDataManager.
+
+    Usage:
+    ```
+    message = await AsyncGymRegistration().register_member(*RegistrationDataGenerator().generate_member_data())
+    print(message)
+    ```
+    """
+    def __init__(self):
+        self.database = AsyncDataManager('mysql')
+
+    async def register_member(self, user_id: str, name: str, surname: str, gender: str, address: str, city: str, document_id: str, jmbg: str):
+        data = (user_id, name, surname, gender, address, city, document_id, jmbg)
+        await self.database.save_data(REGISTER_MEMBER_QUERY, data)
 
         return f"{name} {surname} is registered"
 
+    async def register_members(self, members, batch_size: int = 500):
+        return await self.database.save_many(REGISTER_MEMBER_QUERY, members, batch_size=batch_size)
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import create_stand_in_database
+from data.database import DataManager
+
+
+@pytest.fixture
+def database(tmp_path):
+    """DataManager('mysql') routed to a fresh SQLite database with the tables of the SQL schemas."""
+    manager = create_stand_in_database(str(tmp_path / 'gym.db'))
+    yield manager
+    for previous in DataManager.forget():
+        previous.close()
@@ -0,0 +1,59 @@
+import time
+
+from datetime import date, timedelta
+
+import pytest
+
+from entrance import AdmissionEngine
+from payment import INSERT_MEMBERSHIP_PAYMENT_QUERY
+
+
+def pay(database, user_id, days, log_key=1):
+    today = date.today()
+    database.save_data(INSERT_MEMBERSHIP_PAYMENT_QUERY,
+                       (user_id, log_key, today, '1_month', 4000, today + timedelta(days=days)))
+
+
+@pytest.fixture
+def engine(database, tmp_path):
+    yield AdmissionEngine(snapshot_filename=str(tmp_path / 'admission_snapshot.json'))
+    AdmissionEngine.forget()
+
+
+def test_admit_answers_from_memory_while_the_reload_is_slow(database, engine, monkeypatch):
+    pay(database, '001', 30)
+    engine.refresh()
+    assert engine.admit('001')
+
+    read_data = database.read_data
+
+    def slow_read_data(*args, **kwargs):
+        time.sleep(0.5)
+        return read_data(*args, **kwargs)
+
+    monkeypatch.setattr(database, 'read_data', slow_read_data)
+    payments = engine.stats()['payments']
+    pay(database, '002', 30)
+    engine.index.max_age = 0
+
+    started = time.perf_counter()
+    assert engine.admit('001')
+    assert not engine.admit('002')
+    assert time.perf_counter() - started < 0.1
+
+    # the lookups started a single background reload, which brings in the payment of the other desk
+    refresher = engine.memberships._refresher
+    refresher.join()
+    engine.index.max_age = 60
+    assert engine.admit('002')
+    assert engine.stats()['payments'] == payments + 1
+
+
+def test_refresh_failure_keeps_the_memberships(database, engine, monkeypatch):
+    pay(database, '001', 30)
+    assert engine.refresh()
+    monkeypatch.setattr(database, 'read_data', lambda *args, **kwargs: None)
+
+    assert not engine.refresh()
+    assert engine.admit('001')
+    assert engine.stats()['refresh_failures'] == 1
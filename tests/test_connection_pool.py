@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from data.database import ConnectionPool, PoolTimeoutError
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+        self.alive = True
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**options):
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection(len(opened)))
+        return opened[-1]
+
+    return ConnectionPool(connect, lambda connection: connection.alive, **options), opened
+
+
+def test_checkout_reuses_released_connection():
+    pool, opened = make_pool(min_size=1, max_size=2)
+    with pool.connection() as connection:
+        assert connection is opened[0]
+    with pool.connection() as again:
+        assert again is connection
+    assert connection.rollbacks == 2
+
+    stats = pool.stats()
+    assert stats['checkouts'] == 2
+    assert stats['hits'] == 2
+    assert stats['created'] == 1
+    assert stats['idle'] == 1 and stats['in_use'] == 0
+
+
+def test_checkout_opens_connections_up_to_max_size():
+    pool, opened = make_pool(min_size=0, max_size=2, timeout=0.05)
+    first, second = pool.acquire(), pool.acquire()
+    assert first is not second
+    assert len(opened) == 2
+    assert pool.stats()['in_use'] == 2
+
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    assert pool.stats()['timeouts'] == 1
+    assert len(opened) == 2
+
+
+def test_waiting_checkout_gets_released_connection():
+    pool, opened = make_pool(min_size=0, max_size=1, timeout=5)
+    borrowed = pool.acquire()
+    threading.Timer(0.05, pool.release, (borrowed,)).start()
+
+    assert pool.acquire() is borrowed
+    stats = pool.stats()
+    assert stats['waits'] == 1
+    assert stats['wait_time'] > 0
+    assert len(opened) == 1
+
+
+def test_idle_connections_are_evicted_down_to_min_size():
+    pool, opened = make_pool(min_size=1, max_size=3, max_idle_time=0.05)
+    connections = [pool.acquire() for _ in range(3)]
+    for connection in connections:
+        pool.release(connection)
+    time.sleep(0.1)
+
+    pool.release(pool.acquire())
+    stats = pool.stats()
+    assert stats['evicted'] == 2
+    assert stats['size'] == 1
+    assert sum(connection.closed for connection in opened) == 2
+
+
+def test_dead_connection_is_replaced_on_checkout():
+    pool, opened = make_pool(min_size=1, max_size=1, health_check_after=0)
+    opened[0].alive = False
+
+    connection = pool.acquire()
+    assert connection is opened[1]
+    assert opened[0].closed
+    assert pool.stats()['health_check_failures'] == 1
+
+
+def test_discarded_connection_frees_its_slot():
+    pool, opened = make_pool(min_size=0, max_size=1, timeout=0.05)
+    connection = pool.acquire()
+    pool.release(connection, discard=True)
+    assert connection.closed
+
+    assert pool.acquire() is opened[1]
+    assert pool.stats()['discarded'] == 1
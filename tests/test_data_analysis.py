@@ -0,0 +1,29 @@
+import json
+
+import numpy as np
+
+from data_analysis import GymDataAnalysis
+from payment import INSERT_ACCESS_SESSION_QUERY, INSERT_MEMBERSHIP_PAYMENT_QUERY
+
+
+def test_columns_are_built_from_the_table_rows_without_json(database, monkeypatch):
+    database.save_data(INSERT_MEMBERSHIP_PAYMENT_QUERY, ('001', 1, '2023-10-02', 'monthly', 3000, '2023-11-02'))
+    database.save_data(INSERT_MEMBERSHIP_PAYMENT_QUERY, ('001', 2, '2023-11-02', 'monthly', 3000, '2023-12-02'))
+    database.save_data(INSERT_MEMBERSHIP_PAYMENT_QUERY, ('002', 1, '2023-11-05', 'student', 2000, '2023-12-05'))
+    database.save_data(INSERT_ACCESS_SESSION_QUERY, ('001', '2023-11-08 10:00:00', '2023-11-08 11:30:00'))
+    database.save_data(INSERT_ACCESS_SESSION_QUERY, ('002', '2023-11-08 10:30:00', None))
+
+    def no_json(*args, **kwargs):
+        raise AssertionError("logs must not be serialized for the analytics")
+
+    monkeypatch.setattr(json, 'dumps', no_json)
+    monkeypatch.setattr(json, 'loads', no_json)
+    analysis = GymDataAnalysis()
+
+    months, types, revenue = analysis.revenue_by_type_and_month()
+    assert list(types) == ['monthly', 'student']
+    assert revenue.tolist() == [[3000, 3000], [0, 2000]]
+    assert list(analysis.memberships.user_ids) == ['001', '002']
+    assert analysis.session_durations().tolist() == [90]
+    assert analysis.occupancy_at(['2023-11-08 10:45:00', '2023-11-08 12:00:00']).tolist() == [2, 1]
+    assert np.isnat(analysis.sessions.exit[1])
@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from exit import ExitEventQueue
+
+
+def access_log(hour):
+    return {'entrance_timestamp': f"2023-11-08 {hour:02d}:00:00", 'exit_timestamp': f"2023-11-08 {hour:02d}:45:00"}
+
+
+def stored(database):
+    return database.read_data("SELECT user_id, entrance_timestamp FROM P3_access_session ORDER BY user_id",
+                              primary=True)
+
+
+def journal_lines(queue):
+    with open(queue.journal_filename, 'r') as journal_file:
+        return [json.loads(line) for line in journal_file]
+
+
+@pytest.fixture
+def journal(tmp_path, database):
+    yield str(tmp_path / 'exit_journal.jsonl')
+    ExitEventQueue.forget()
+
+
+def restart(journal, **options):
+    """Queue of a gate process started again on the same journal."""
+    ExitEventQueue.forget()
+    return ExitEventQueue(journal, fsync=False, **options)
+
+
+def test_sessions_are_journaled_until_flushed(database, journal):
+    queue = ExitEventQueue(journal, fsync=False)
+    queue.record_exit('001', access_log(10))
+    queue.record_exit('002', access_log(11))
+    assert [entry['user_id'] for entry in journal_lines(queue)] == ['001', '002']
+    assert stored(database) == []
+
+    assert queue.flush_all() == 2
+    assert len(stored(database)) == 2
+    assert journal_lines(queue) == []
+    assert queue.stats()['flushed'] == 2
+
+
+def test_unflushed_sessions_are_replayed_after_restart(database, journal):
+    queue = ExitEventQueue(journal, batch_size=1, fsync=False)
+    queue.record_exit('001', access_log(10))
+    queue.record_exit('002', access_log(11))
+    queue.record_exit('003', access_log(12))
+    assert queue.flush() == 1
+
+    replayed = restart(journal)
+    assert replayed.stats()['depth'] == 2
+    replayed.record_exit('004', access_log(13))
+    assert [entry['seq'] for entry in replayed._pending] == [2, 3, 4]
+
+    assert replayed.flush_all() == 3
+    assert [user_id for user_id, _ in stored(database)] == ['001', '002', '003', '004']
+
+
+def test_torn_journal_line_is_ignored_on_replay(database, journal):
+    queue = ExitEventQueue(journal, fsync=False)
+    queue.record_exit('001', access_log(10))
+    with open(journal, 'a') as journal_file:
+        journal_file.write('{"seq": 2, "user_id": "00')
+
+    replayed = restart(journal)
+    assert [entry['user_id'] for entry in replayed._pending] == ['001']
+
+
+def test_sessions_already_stored_are_dropped(database, journal):
+    queue = ExitEventQueue(journal, fsync=False)
+    queue.record_exit('001', access_log(10))
+    queue.record_exit('002', access_log(11))
+    # stored before the crash, but the journal was not marked as flushed
+    queue.sessions.record_session('001', access_log(10))
+
+    replayed = restart(journal)
+    assert replayed.flush_all() == 2
+    stats = replayed.stats()
+    assert stats['already_stored'] == 1
+    assert stats['flushed'] == 1
+    assert stats['set_aside'] == 0
+    assert stats['depth'] == 0
+    assert [user_id for user_id, _ in stored(database)] == ['001', '002']
+    assert journal_lines(replayed) == []
+
+
+def test_failing_session_is_set_aside_after_max_attempts(database, journal):
+    queue = ExitEventQueue(journal, max_attempts=2, fsync=False)
+    queue.record_exit('001', access_log(10))
+    queue.record_exit('002', {'entrance_timestamp': None, 'exit_timestamp': None})
+    queue.record_exit('003', access_log(12))
+
+    assert queue.flush() == 2
+    assert queue.stats()['depth'] == 1
+    assert journal_lines(queue)[-1] == {'flushed': 1}
+
+    assert queue.flush() == 1
+    stats = queue.stats()
+    assert stats['retried'] == 2
+    assert stats['set_aside'] == 1
+    assert stats['depth'] == 0
+    assert [user_id for user_id, _ in stored(database)] == ['001', '003']
+
+    with open(journal + '.failed', 'r') as failed_file:
+        failed = [json.loads(line) for line in failed_file]
+    assert [(event['user_id'], event['attempts']) for event in failed] == [('002', 2)]
+    assert failed[0]['error']
+    assert journal_lines(queue) == []
@@ -0,0 +1,64 @@
+import json
+import os
+import threading
+
+import pytest
+
+from data.json_data_manager import DELETE, JSONData
+
+
+@pytest.fixture
+def json_file(tmp_path):
+    filename = str(tmp_path / 'gym_id_card.json')
+    with open(filename, 'w') as data_file:
+        json.dump({"userID": "001", "access_log": {"entrance_timestamp": None}}, data_file)
+    yield filename
+    JSONData.clear_cache()
+
+
+def test_write_many_applies_every_update(json_file):
+    json_data = JSONData(json_file)
+    json_data.write_many([(["access_log", "entrance_timestamp"], "2023-11-08 10:00:00"), (["userID"], DELETE),
+                          (["lockerNumber"], 12)])
+
+    with open(json_file, 'r') as data_file:
+        assert json.load(data_file) == {"access_log": {"entrance_timestamp": "2023-11-08 10:00:00"},
+                                        "lockerNumber": 12}
+    assert json_data.read_json("lockerNumber") == 12
+
+
+def test_crash_between_the_temporary_write_and_the_rename_keeps_the_file(json_file, monkeypatch):
+    json_data = JSONData(json_file)
+    assert json_data.read_json("userID") == "001"
+
+    def crash(source, destination):
+        raise OSError("power loss")
+
+    monkeypatch.setattr(os, 'replace', crash)
+    with pytest.raises(OSError):
+        json_data.write_json(["userID"], "002")
+    monkeypatch.undo()
+
+    with open(json_file, 'r') as data_file:
+        assert json.load(data_file)["userID"] == "001"
+    # no temporary file is left behind
+    assert [entry for entry in os.listdir(os.path.dirname(json_file)) if not entry.endswith('.lock')] == \
+        [os.path.basename(json_file)]
+    assert json_data.read_json("userID") == "001"
+
+
+def test_concurrent_writers_do_not_lose_updates(json_file):
+    def write(thread_number):
+        for idx in range(20):
+            JSONData(json_file).write_json([f"writer_{thread_number}", str(idx)], idx)
+
+    threads = [threading.Thread(target=write, args=(thread_number,)) for thread_number in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(json_file, 'r') as data_file:
+        data = json.load(data_file)
+    for thread_number in range(4):
+        assert data[f"writer_{thread_number}"] == {str(idx): idx for idx in range(20)}
@@ -0,0 +1,154 @@
+import json
+
+import pytest
+
+from lockers import LockerAllocator
+
+
+ZONES = {"M": {"S": [1, 3], "L": [4, 5]}, "F": {"S": [6, 8]}}
+
+
+@pytest.fixture
+def files(tmp_path):
+    filename, journal = str(tmp_path / 'lockers.json'), str(tmp_path / 'lockers_journal.jsonl')
+    with open(filename, 'w') as json_file:
+        json.dump({"zones": ZONES, "assigned": {}}, json_file)
+    yield filename, journal
+    LockerAllocator.forget()
+
+
+def terminal(files):
+    """Allocator of another entrance terminal working on the same files."""
+    LockerAllocator.forget()
+    return LockerAllocator(*files)
+
+
+def journal_lines(files):
+    with open(files[1], 'r') as journal_file:
+        return [json.loads(line) for line in journal_file]
+
+
+def journal_events(files):
+    """Assignments and releases of the journal, without its generation header."""
+    return [event for event in journal_lines(files) if "op" in event]
+
+
+def test_lowest_free_locker_of_the_pool_is_assigned(files):
+    lockers = LockerAllocator(*files)
+    assert lockers.assign('001', zone='M', size='S') == 1
+    assert lockers.assign('002', zone='M', size='S') == 2
+    assert lockers.assign('001', zone='M', size='S') == 1
+    assert lockers.release(user_id='001') == 1
+    assert lockers.assign('003', zone='M', size='S') == 1
+    assert lockers.available(zone='M', size='S') == 1
+    assert [event['op'] for event in journal_events(files)] == ['assign', 'assign', 'release', 'assign']
+
+
+def test_journal_is_replayed_on_start(files):
+    lockers = LockerAllocator(*files)
+    lockers.assign('001', zone='F')
+    lockers.assign('002', zone='F')
+    lockers.release(user_id='001')
+
+    restarted = terminal(files)
+    assert restarted.get_member_locker('001') is None
+    assert restarted.get_member_locker('002') == 7
+    assert restarted.get_locker_member(7) == '002'
+    assert restarted.available(zone='F') == 2
+    assert restarted.assign('003', zone='F') == 6
+
+
+def test_terminals_never_hand_out_the_same_locker(files):
+    first = LockerAllocator(*files)
+    second = terminal(files)
+
+    assert first.assign('001', zone='M', size='L') == 4
+    assert second.assign('002', zone='M', size='L') == 5
+    assert first.assign('003', zone='M', size='L') is None
+    assert second.release(user_id='001') == 4
+    assert first.assign('003', zone='M', size='L') == 4
+
+
+def test_torn_journal_line_is_ignored(files):
+    lockers = LockerAllocator(*files)
+    lockers.assign('001', zone='M', size='S')
+    with open(files[1], 'a') as journal_file:
+        journal_file.write('{"op": "assign", "locker": 2, "user_')
+
+    restarted = terminal(files)
+    assert restarted.get_member_locker('001') == 1
+    assert restarted.get_locker_member(2) is None
+
+
+def test_compact_folds_the_journal_into_the_snapshot(files):
+    lockers = LockerAllocator(*files)
+    lockers.assign('001', zone='M', size='S')
+    lockers.assign('002', zone='F')
+    lockers.release(user_id='001')
+    lockers.assign('003', zone='M', size='L')
+
+    lockers.compact()
+    assert journal_lines(files) == [{"generation": 1}]
+    with open(files[0], 'r') as json_file:
+        snapshot = json.load(json_file)
+    assert snapshot == {"zones": ZONES, "assigned": {"4": "003", "6": "002"}, "generation": 1}
+
+    lockers.assign('004', zone='M', size='S')
+    restarted = terminal(files)
+    assert restarted.get_member_locker('002') == 6
+    assert restarted.get_member_locker('003') == 4
+    assert restarted.get_member_locker('004') == 1
+    assert restarted.get_member_locker('001') is None
+
+
+def test_terminal_reloads_after_another_terminal_compacted(files):
+    first = LockerAllocator(*files)
+    second = terminal(files)
+    first.assign('001', zone='M', size='S')
+    first.compact()
+    first.assign('002', zone='M', size='S')
+
+    assert second.assign('003', zone='M', size='S') == 3
+    assert second.get_member_locker('001') == 1
+    assert second.get_member_locker('002') == 2
+
+
+def test_terminal_reloads_after_repeated_compactions_by_another_terminal(files):
+    first = LockerAllocator(*files)
+    second = terminal(files)
+    assert first.assign('001', zone='M', size='S') == 1
+    for user_id in ('101', '102', '103'):
+        second.assign(user_id, zone='M', size='L')
+        second.compact()
+    second.release(user_id='103')
+    second.assign('104', zone='F')
+
+    assert first.assign('003', zone='M', size='S') == 2
+    assert first.get_locker_member(4) == '101'
+    assert first.get_locker_member(5) == '102'
+    assert first.get_member_locker('103') is None
+    assert first.get_member_locker('104') == 6
+    with open(files[0], 'r') as json_file:
+        assert json.load(json_file)["generation"] == 3
+
+
+def test_journal_of_an_interrupted_compaction_is_not_replayed(files, monkeypatch):
+    lockers = LockerAllocator(*files)
+    lockers.assign('001', zone='M', size='S')
+    lockers.release(user_id='001')
+    lockers.assign('002', zone='M', size='S')
+
+    def crash():
+        raise OSError("power loss")
+
+    monkeypatch.setattr(lockers, '_start_journal', crash)
+    with pytest.raises(OSError):
+        lockers.compact()
+    assert journal_lines(files)[0] == {"generation": 0}
+    assert len(journal_events(files)) == 3
+
+    restarted = terminal(files)
+    assert restarted.get_member_locker('002') == 1
+    assert journal_lines(files) == [{"generation": 1}]
+    assert restarted.assign('003', zone='M', size='S') == 2
+    assert terminal(files).get_member_locker('003') == 2
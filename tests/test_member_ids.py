@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+from data.member_ids import MemberIdAllocator
+from registration import REGISTER_MEMBER_QUERY
+
+
+@pytest.fixture
+def allocators(database):
+    yield
+    MemberIdAllocator.forget()
+
+
+def register(database, user_id):
+    database.save_data(REGISTER_MEMBER_QUERY, (user_id, 'Marko', 'Marković', 'M', 'Ulica 2', 'Novi Sad',
+                                               '000000002', '0202990710002'))
+
+
+def test_sequence_is_seeded_after_the_numerically_highest_member_id(database, allocators):
+    for user_id in ('099', '100', '009'):
+        register(database, user_id)
+    assert MemberIdAllocator().next_id() == 101
+
+
+def test_sequence_starts_at_one_without_members(database, allocators):
+    assert MemberIdAllocator().allocate(3) == 1
+    assert MemberIdAllocator().allocate(1) == 4
+
+
+def test_sequence_is_not_created_when_the_members_cannot_be_read(database, allocators, monkeypatch):
+    monkeypatch.setattr(database, 'read_data', lambda *args, **kwargs: None)
+    with pytest.raises(RuntimeError):
+        MemberIdAllocator().allocate(1)
+
+
+def test_two_allocators_reserve_disjoint_blocks(database, allocators):
+    register(database, '010')
+    first, second = MemberIdAllocator(block_size=5), MemberIdAllocator(block_size=7)
+    assert first is not second
+
+    ids = [first.next_id(), second.next_id(), first.next_id(), second.allocate(3)]
+    assert ids == [11, 16, 12, 23]
+    assert second.next_id() == 17
+
+
+def test_concurrent_desks_never_get_the_same_id(database, allocators):
+    allocators_of_desks = [MemberIdAllocator(block_size=size) for size in (1, 3, 4, 8)]
+    ids, lock = [], threading.Lock()
+
+    def register_members(allocator):
+        for _ in range(25):
+            member_id = allocator.next_id()
+            with lock:
+                ids.append(member_id)
+
+    threads = [threading.Thread(target=register_members, args=(allocator,)) for allocator in allocators_of_desks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(ids) == 100
+    assert len(set(ids)) == 100
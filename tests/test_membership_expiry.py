@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+import pytest
+
+from data.membership_expiry import MembershipExpiryScheduler
+from payment import INSERT_MEMBERSHIP_PAYMENT_QUERY
+
+
+TODAY = date.today()
+
+
+def pay(database, user_id, days, log_key=1):
+    database.save_data(INSERT_MEMBERSHIP_PAYMENT_QUERY,
+                       (user_id, log_key, TODAY, '1_month', 4000, TODAY + timedelta(days=days)))
+
+
+@pytest.fixture
+def scheduler(database):
+    for user_id, days in (('001', 1), ('002', 3), ('003', 3), ('004', 10), ('005', -2)):
+        pay(database, user_id, days)
+    return MembershipExpiryScheduler()
+
+
+def test_advance_across_a_date_jump_lapses_the_passed_days(scheduler):
+    lapsed = []
+    scheduler.subscribe(lambda user_id, valid_to: lapsed.append((user_id, valid_to)))
+    assert scheduler.active_members() == 4
+    assert scheduler.expiring_lists((1, 3)) == {1: ['001'], 3: ['002', '003']}
+
+    assert scheduler.advance(TODAY + timedelta(days=5)) == ['001', '002', '003']
+    assert lapsed == [('001', TODAY + timedelta(days=1)), ('002', TODAY + timedelta(days=3)),
+                      ('003', TODAY + timedelta(days=3))]
+    assert scheduler.is_active('004') and not scheduler.is_active('002')
+    assert scheduler.expiring(5) == ['004']
+
+    # an earlier day does not move the queue back
+    assert scheduler.advance(TODAY + timedelta(days=2)) == []
+    assert scheduler.stats()['today'] == (TODAY + timedelta(days=5)).isoformat()
+
+
+def test_advance_after_a_long_pause_visits_only_queued_days(scheduler):
+    assert scheduler.advance(TODAY + timedelta(days=1000)) == ['001', '002', '003', '004']
+    stats = scheduler.stats()
+    assert stats['active'] == 0
+    assert stats['queued_days'] == 0
+    assert stats['lapsed'] == 4
+
+
+def test_refresh_moves_only_the_extended_memberships(database, scheduler, monkeypatch):
+    def rebuild(*args, **kwargs):
+        raise AssertionError("refresh() must not rebuild the queue")
+
+    monkeypatch.setattr(scheduler, 'load', rebuild)
+    # payments recorded by another desk
+    pay(database, '001', 7, log_key=2)
+    pay(database, '006', 3)
+
+    assert scheduler.refresh() == 5
+    assert scheduler.get_valid_to('001') == TODAY + timedelta(days=7)
+    assert scheduler.expiring(3) == ['002', '003', '006']
+    assert scheduler.expiring(1) == []
+    stats = scheduler.stats()
+    assert stats['payments'] == 2
+    assert stats['extended'] == 1
@@ -0,0 +1,46 @@
+import json
+
+from data import migrations
+
+
+def test_membership_logs_are_streamed_into_payment_rows(database, monkeypatch):
+    membership_log = {"1": {"payment_date": "2023-10-02", "membership_type": "monthly", "sum_payed": 3000,
+                            "membership_valid_to": "2023-11-02"},
+                      "2": {"payment_date": "2023-11-02", "membership_type": "monthly", "sum_payed": 3000,
+                            "membership_valid_to": "2023-12-02"}}
+    database.save_data("INSERT INTO P3_user_log (user_id, membership_log) VALUES (%s, %s)",
+                       ('001', json.dumps(membership_log)))
+
+    def read_all(*args, **kwargs):
+        raise AssertionError("the membership logs must be streamed")
+
+    monkeypatch.setattr(database, 'read_data', read_all)
+    results = migrations.migrate_membership_logs(batch_size=1)
+    monkeypatch.undo()
+
+    assert [result['saved'] for result in results] == [1, 1]
+    assert database.read_data("SELECT user_id, log_key, membership_valid_to FROM P3_membership_payment "
+                              "ORDER BY log_key", primary=True) == [('001', 1, '2023-11-02'),
+                                                                    ('001', 2, '2023-12-02')]
+    # re-running the migration reports the rows as already migrated
+    assert [len(result['failed']) for result in migrations.migrate_membership_logs()] == [2]
+
+
+def test_schema_is_found_from_any_working_directory(database, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    saved = []
+    monkeypatch.setattr(database, 'save_data', lambda ddl, params: saved.append(ddl))
+
+    migrations.apply_schema('p3_sequence.sql')
+    assert 'P3_sequence' in saved[0]
+
+
+def test_access_logs_are_migrated_to_sessions(database):
+    access_log = {"1": {"entrance_timestamp": "2023-11-08 10:00:00", "exit_timestamp": "2023-11-08 11:00:00"},
+                  "2": {"entrance_timestamp": None, "exit_timestamp": None}}
+    database.save_data("INSERT INTO P3_user_log (user_id, access_log) VALUES (%s, %s)",
+                       ('001', json.dumps(access_log)))
+
+    assert [result['saved'] for result in migrations.migrate_access_logs()] == [1]
+    assert database.read_data("SELECT user_id, entrance_timestamp, exit_timestamp FROM P3_access_session",
+                              primary=True) == [('001', '2023-11-08 10:00:00', '2023-11-08 11:00:00')]
@@ -0,0 +1,60 @@
+from data.query_cache import QueryCache
+from registration import REGISTER_MEMBER_QUERY
+
+
+USER_IDS_QUERY = "SELECT user_id FROM P3_user ORDER BY user_id"
+
+
+def register(database, user_id):
+    database.save_data(REGISTER_MEMBER_QUERY, (user_id, 'Ana', 'Anić', 'F', 'Ulica 1', 'Beograd', '000000001',
+                                               '0101990715001'))
+
+
+def test_result_of_a_query_overlapping_a_write_is_not_cached():
+    cache = QueryCache()
+    generation = cache.generation(USER_IDS_QUERY)
+    cache.invalidate(REGISTER_MEMBER_QUERY)
+
+    assert cache.put(USER_IDS_QUERY, None, [('001',)], generation=generation) == [('001',)]
+    assert cache.get(USER_IDS_QUERY) is None
+    assert cache.stats()['stale'] == 1
+
+    # a write to another table does not affect the result
+    generation = cache.generation(USER_IDS_QUERY)
+    cache.invalidate(tables=['P3_access_session'])
+    cache.put(USER_IDS_QUERY, None, [('001',)], generation=generation)
+    assert cache.get(USER_IDS_QUERY) == [('001',)]
+
+
+def test_clear_during_a_query_keeps_the_result_out_of_the_cache():
+    cache = QueryCache()
+    generation = cache.generation(USER_IDS_QUERY)
+    cache.clear()
+    cache.put(USER_IDS_QUERY, None, [('001',)], generation=generation)
+    assert cache.get(USER_IDS_QUERY) is None
+
+
+def test_cached_read_is_invalidated_by_a_write_that_overlaps_it(database, monkeypatch):
+    register(database, '001')
+    put = database.cache.put
+
+    def put_after_write(*args, **kwargs):
+        # another desk registers a member after the query ran, before its result is cached
+        register(database, '002')
+        return put(*args, **kwargs)
+
+    monkeypatch.setattr(database.cache, 'put', put_after_write)
+    assert database.read_data(USER_IDS_QUERY, cached=True) == [('001',)]
+    monkeypatch.undo()
+
+    assert database.read_data(USER_IDS_QUERY, cached=True) == [('001',), ('002',)]
+    assert database.cache.stats()['stale'] == 1
+
+
+def test_cached_read_is_invalidated_by_a_later_write(database):
+    register(database, '001')
+    assert database.read_data(USER_IDS_QUERY, cached=True) == [('001',)]
+    assert database.read_data(USER_IDS_QUERY, cached=True) == [('001',)]
+    register(database, '002')
+    assert database.read_data(USER_IDS_QUERY, cached=True) == [('001',), ('002',)]
+    assert database.cache.stats()['hits'] == 1
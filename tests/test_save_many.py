@@ -0,0 +1,41 @@
+from payment import INSERT_ACCESS_SESSION_QUERY
+
+
+def session(user_id, hour):
+    return (user_id, f"2023-11-08 {hour:02d}:00:00", f"2023-11-08 {hour:02d}:45:00")
+
+
+def stored(database):
+    return database.read_data("SELECT user_id, entrance_timestamp FROM P3_access_session ORDER BY user_id",
+                              primary=True)
+
+
+def test_rows_are_saved_in_chunks(database):
+    rows = (session(f"{idx:03d}", 10) for idx in range(5))
+    results = database.save_many(INSERT_ACCESS_SESSION_QUERY, rows, batch_size=2)
+
+    assert [(result['chunk'], result['rows'], result['saved']) for result in results] == [(0, 2, 2), (1, 2, 2),
+                                                                                           (2, 1, 1)]
+    assert all(result['failed'] == [] for result in results)
+    assert len(stored(database)) == 5
+
+
+def test_failing_rows_are_reported_and_the_rest_of_the_chunk_is_saved(database):
+    database.save_data(INSERT_ACCESS_SESSION_QUERY, session('002', 10))
+    rows = [session('001', 10), session('002', 10), session('003', 10), ('004', None, None), session('005', 10)]
+    results = database.save_many(INSERT_ACCESS_SESSION_QUERY, rows, batch_size=3)
+
+    assert [result['saved'] for result in results] == [2, 1]
+    assert [idx for result in results for idx, _ in result['failed']] == [1, 3]
+    assert [user_id for user_id, _ in stored(database)] == ['001', '002', '003', '005']
+
+
+def test_failed_chunk_is_rolled_back_without_fallback(database):
+    database.save_data(INSERT_ACCESS_SESSION_QUERY, session('002', 10))
+    rows = [session('001', 10), session('002', 10), session('003', 10), session('004', 10)]
+    results = database.save_many(INSERT_ACCESS_SESSION_QUERY, rows, batch_size=2, fallback=False)
+
+    assert results[0]['saved'] == 0
+    assert [idx for idx, _ in results[0]['failed']] == [0, 1]
+    assert results[1]['saved'] == 2
+    assert [user_id for user_id, _ in stored(database)] == ['002', '003', '004']